@@ -0,0 +1,239 @@
+"""
+Summarizes YouTube videos and podcast episodes from the command line, without Discord.
+
+Takes a file of URLs (one per line, '-' for stdin), a YouTube playlist or a
+channel's uploads, and summarizes them concurrently with the same transcript,
+download and Gemini code as the bots, sharing their caches:
+
+    python batch-summarizer.py urls.txt -o summaries.jsonl
+    python batch-summarizer.py --playlist PLxxxxxxxx -o summaries.jsonl --concurrency 8
+    python batch-summarizer.py --channel UCxxxxxxxx --limit 20
+
+Each finished item is appended to the output as one JSON line. Rerunning with
+the same output skips the URLs that already have an "ok" line, so an
+interrupted run continues where it stopped and failed items are retried.
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import sys
+import time
+from urllib.parse import parse_qs, urlparse
+
+from discord_agents.jobs import run_blocking
+from discord_agents.metrics import metrics
+
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', '4'))
+# YouTube Data API page size limit
+PLAYLIST_PAGE_SIZE = 50
+
+_bots = {}
+
+
+def load_bot(filename):
+    """Imports one of the bot scripts by path, once. Discord is never connected."""
+    if filename not in _bots:
+        name = filename[:-3].replace('-', '_')
+        spec = importlib.util.spec_from_file_location(name, os.path.join(REPO_ROOT, filename))
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+        _bots[filename] = module
+    return _bots[filename]
+
+
+def youtube_video_url(url):
+    """Returns the canonical watch URL of a YouTube video link, or None for other URLs."""
+    parsed = urlparse(url)
+    host = parsed.netloc.lower().removeprefix('www.').removeprefix('m.')
+    if host == 'youtu.be' and parsed.path.strip('/'):
+        video_id = parsed.path.strip('/').split('/')[0]
+    elif host == 'youtube.com' and parsed.path == '/watch':
+        video_id = parse_qs(parsed.query).get('v', [None])[0]
+    else:
+        return None
+    return video_id and f"https://www.youtube.com/watch?v={video_id}"
+
+
+def read_urls(path):
+    """Reads URLs from a file, skipping blank lines and # comments."""
+    f = sys.stdin if path == '-' else open(path, 'r', encoding='utf-8')
+    try:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def playlist_urls(playlist_id, limit=None):
+    """Lists the video URLs of a YouTube playlist, in playlist order."""
+    youtube_bot = load_bot('youtube-summarizer.py')
+    youtube = youtube_bot.get_youtube_client(youtube_bot.YOUTUBE_DATA_API_KEY)
+    urls = []
+    page_token = None
+    while limit is None or len(urls) < limit:
+        response = youtube.playlistItems().list(
+            part='contentDetails', playlistId=playlist_id, maxResults=PLAYLIST_PAGE_SIZE, pageToken=page_token,
+        ).execute()
+        urls.extend(
+            f"https://www.youtube.com/watch?v={item['contentDetails']['videoId']}"
+            for item in response.get('items', [])
+        )
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            break
+    return urls[:limit] if limit is not None else urls
+
+
+def channel_uploads_playlist(channel_id):
+    """Returns the id of the playlist holding a channel's uploads."""
+    youtube_bot = load_bot('youtube-summarizer.py')
+    youtube = youtube_bot.get_youtube_client(youtube_bot.YOUTUBE_DATA_API_KEY)
+    response = youtube.channels().list(part='contentDetails', id=channel_id).execute()
+    items = response.get('items') or []
+    if not items:
+        raise ValueError(f"Channel not found: {channel_id}")
+    return items[0]['contentDetails']['relatedPlaylists']['uploads']
+
+
+def completed_urls(output_path):
+    """Returns the URLs that already have a successful line in the output file."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A line cut short by an interrupted run
+                continue
+            if record.get('status') == 'ok':
+                done.add(record['url'])
+    return done
+
+
+async def summarize_video(url):
+    bot = load_bot('youtube-summarizer.py')
+    video_id = bot.extract_video_id(url)
+    transcript, info = await asyncio.gather(
+        run_blocking('transcript', bot.get_video_transcript, video_id),
+        run_blocking('metadata', bot.get_youtube_video_info, bot.YOUTUBE_DATA_API_KEY, url),
+    )
+    if not transcript:
+        raise RuntimeError('Failed to get transcript for video')
+    entries = await run_blocking('transcript', bot.get_transcript_entries, video_id)
+    summary = await run_blocking('llm', bot.generate_summary, transcript, entries=entries)
+    result = json.loads(info) if info else {}
+    return {
+        'type': 'youtube',
+        'title': result.get('title', 'N/A').strip(),
+        'channel': result.get('channel', 'N/A'),
+        'release_date': bot.format_timestamp(result.get('release_date', '')),
+        'summary': summary,
+    }
+
+
+async def summarize_episode(url):
+    bot = load_bot('podcast-summarizer.py')
+    info = await bot.extract_podcast_info(url)
+    download = info and await run_blocking('download', bot.download_podcast, info['download_url'])
+    if not download:
+        raise RuntimeError('Failed to download content')
+    try:
+        summary = await run_blocking('llm', bot.generate_summary, download)
+    finally:
+        bot.downloader.release(download)
+    return {
+        'type': 'podcast',
+        'title': info['episode_title'],
+        'podcast': info['podcast_title'],
+        'release_date': info['release_date'],
+        'summary': summary,
+    }
+
+
+async def summarize(url):
+    video_url = youtube_video_url(url)
+    if video_url:
+        return await summarize_video(video_url)
+    return await summarize_episode(url)
+
+
+async def run_batch(urls, output_path, concurrency):
+    """
+    Summarizes urls, at most `concurrency` at a time, appending one JSON line per URL.
+
+    Returns:
+        tuple: Number of (succeeded, failed) items.
+    """
+    limit = asyncio.Semaphore(concurrency)
+    counts = {'ok': 0, 'error': 0}
+
+    async def process(url, out):
+        async with limit:
+            start = time.perf_counter()
+            try:
+                record = {'url': url, 'status': 'ok', **await summarize(url)}
+            except Exception as e:
+                record = {'url': url, 'status': 'error', 'error': f"{type(e).__name__}: {e}"}
+            record['seconds'] = round(time.perf_counter() - start, 2)
+            counts[record['status']] += 1
+            metrics.count('batch_items', status=record['status'])
+            # Written as soon as each item finishes, so an interruption loses nothing already done
+            out.write(json.dumps(record, ensure_ascii=False) + '\n')
+            out.flush()
+            done = counts['ok'] + counts['error']
+            print(f"[{done}/{len(urls)}] {record['status']:<5} {url} ({record['seconds']:.1f}s)")
+
+    with open(output_path, 'a', encoding='utf-8') as out:
+        await asyncio.gather(*(process(url, out) for url in urls))
+    return counts['ok'], counts['error']
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Summarize YouTube videos and podcast episodes in batch.')
+    parser.add_argument('urls', nargs='?', help="File with one URL per line, or '-' for stdin")
+    parser.add_argument('--playlist', '-p', help='YouTube playlist id to summarize')
+    parser.add_argument('--channel', help="YouTube channel id whose uploads to summarize")
+    parser.add_argument('--output', '-o', default='summaries.jsonl', help='JSON lines file to append results to')
+    parser.add_argument('--concurrency', '-c', type=int, default=BATCH_CONCURRENCY, help='Items processed at the same time')
+    parser.add_argument('--limit', '-n', type=int, help='Only the first N items')
+    args = parser.parse_args()
+    if not (args.urls or args.playlist or args.channel):
+        parser.error('give a URL file, --playlist or --channel')
+    metrics.configure(bot='batch-summarizer')
+
+    urls = read_urls(args.urls) if args.urls else []
+    if args.playlist:
+        urls += playlist_urls(args.playlist, args.limit)
+    if args.channel:
+        urls += playlist_urls(channel_uploads_playlist(args.channel), args.limit)
+    urls = [youtube_video_url(url) or url for url in urls]
+    # Same video listed twice, or linked in two forms
+    urls = list(dict.fromkeys(urls))[:args.limit]
+
+    done = completed_urls(args.output)
+    pending = [url for url in urls if url not in done]
+    if len(pending) < len(urls):
+        print(f"Skipping {len(urls) - len(pending)} items already in {args.output}")
+    if not pending:
+        return
+
+    if any(not youtube_video_url(url) for url in pending):
+        # Episodes left behind by an interrupted run
+        load_bot('podcast-summarizer.py').downloader.cleanup()
+    try:
+        succeeded, failed = asyncio.run(run_batch(pending, args.output, args.concurrency))
+    finally:
+        metrics.event('snapshot', **metrics.snapshot())
+    print(f"Done: {succeeded} summarized, {failed} failed, results in {args.output}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1 @@
+"""Offline benchmarks for the bots. Run with python -m benchmarks.bench_bots."""
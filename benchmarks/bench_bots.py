@@ -0,0 +1,269 @@
+"""
+Offline end-to-end benchmark for the three bots.
+
+Every external service (Vertex AI, Discord, Gmail, YouTube, podcast hosts) is
+replaced by the local stand-ins in benchmarks/fakes.py, which sleep for
+configurable latencies instead of doing network I/O. Each pipeline runs in its
+own subprocess with a fresh cache folder, and the report shows request latency
+percentiles, throughput and the peak RSS of that process.
+
+    python -m benchmarks.bench_bots
+    python -m benchmarks.bench_bots --pipelines youtube,ask --requests 40 --json
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PIPELINES = ['youtube', 'ask', 'podcast', 'nord']
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+
+def load_script(filename, name):
+    """Imports one of the bot scripts by path, as the module `name`."""
+    spec = importlib.util.spec_from_file_location(name, os.path.join(REPO_ROOT, filename))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+class LatencyRecorder:
+    """Wraps a bot job function to time each request from post to completion."""
+
+    def __init__(self, module, name):
+        self.posted = {}
+        self.latencies = []
+        original = getattr(module, name)
+
+        async def timed(channel, key, *args):
+            try:
+                return await original(channel, key, *args)
+            finally:
+                self.latencies.append(time.perf_counter() - self.posted.pop((channel.id, key)))
+        setattr(module, name, timed)
+
+    def post(self, channel, key):
+        self.posted[(channel.id, key)] = time.perf_counter()
+
+
+async def drain(job_queue):
+    while job_queue._workers:
+        await asyncio.gather(*list(job_queue._workers.values()))
+
+
+async def post_all(bot, messages):
+    for message in messages:
+        await bot.on_message(message)
+
+
+def bench_youtube(fakes, args):
+    bot = load_script('youtube-summarizer.py', 'youtube_summarizer')
+    recorder = LatencyRecorder(bot, 'process_video')
+    channels = [fakes.FakeChannel(bot.INBOX_CHANNEL) for _ in range(args.concurrency)]
+
+    async def run():
+        messages = []
+        for i in range(args.requests):
+            channel = channels[i % len(channels)]
+            url = f"https://www.youtube.com/watch?v=bench{i:05d}"
+            recorder.post(channel, url)
+            messages.append(fakes.FakeMessage(channel, url))
+        started = time.perf_counter()
+        await post_all(bot, messages)
+        await drain(bot.job_queue)
+        return time.perf_counter() - started
+
+    elapsed = asyncio.run(run())
+    return recorder.latencies, elapsed
+
+
+def bench_ask(fakes, args):
+    bot = load_script('youtube-summarizer.py', 'youtube_summarizer')
+    recorder = LatencyRecorder(bot, 'answer_question')
+    channels = [fakes.FakeChannel(bot.INBOX_CHANNEL) for _ in range(args.concurrency)]
+
+    async def run():
+        # Each channel gets one processed video first; only the questions are timed
+        for i, channel in enumerate(channels):
+            await bot.on_message(fakes.FakeMessage(channel, f"https://www.youtube.com/watch?v=ask{i:05d}"))
+        await drain(bot.job_queue)
+
+        messages = []
+        for i in range(args.requests):
+            channel = channels[i % len(channels)]
+            question = f"What did they say about research and data, question {i}?"
+            recorder.post(channel, question)
+            messages.append(fakes.FakeMessage(channel, f"/ask {question}"))
+        started = time.perf_counter()
+        await post_all(bot, messages)
+        await drain(bot.job_queue)
+        return time.perf_counter() - started
+
+    elapsed = asyncio.run(run())
+    return recorder.latencies, elapsed
+
+
+def bench_podcast(fakes, args):
+    bot = load_script('podcast-summarizer.py', 'podcast_summarizer')
+    recorder = LatencyRecorder(bot, 'process_podcast')
+    channels = [fakes.FakeChannel(bot.INBOX_CHANNEL) for _ in range(args.concurrency)]
+
+    async def run():
+        messages = []
+        for i in range(args.requests):
+            channel = channels[i % len(channels)]
+            url = f"https://podcasts.example.com/episodes/{i + 1}"
+            recorder.post(channel, url)
+            messages.append(fakes.FakeMessage(channel, url))
+        started = time.perf_counter()
+        await post_all(bot, messages)
+        await drain(bot.job_queue)
+        return time.perf_counter() - started
+
+    elapsed = asyncio.run(run())
+    return recorder.latencies, elapsed
+
+
+def bench_nord(fakes, args):
+    fakes.mailbox.__init__(args.requests)
+    bot = load_script('nord-news-bot.py', 'nord_news_bot')
+    latencies = []
+    analyze_message = bot.analyze_message
+
+    def timed(message):
+        started = time.perf_counter()
+        try:
+            return analyze_message(message)
+        finally:
+            latencies.append(time.perf_counter() - started)
+    bot.analyze_message = timed
+
+    started = time.perf_counter()
+    bot.process_backlog('bench@example.com', 'finance/nord', args.concurrency)
+    return latencies, time.perf_counter() - started
+
+
+BENCHMARKS = {
+    'youtube': bench_youtube,
+    'ask': bench_ask,
+    'podcast': bench_podcast,
+    'nord': bench_nord,
+}
+
+
+def run_pipeline(pipeline, args):
+    """Runs one pipeline in this process and returns its result dict."""
+    workdir = tempfile.mkdtemp(prefix=f'bench-{pipeline}-')
+    os.chdir(workdir)
+    os.environ.setdefault('BOT_STREAM_EDIT_INTERVAL', str(args.edit_interval))
+    os.environ['BOT_MAX_PENDING_JOBS'] = str(max(args.requests + args.concurrency, 50))
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+
+    from benchmarks import fakes
+    fakes.install()
+    fakes.config.llm_first_token = args.llm_latency
+    fakes.config.discord_latency = args.discord_latency
+    fakes.config.llm_rate_limited = args.rate_limited
+    os.environ.setdefault('VERTEX_BACKOFF_BASE_SECONDS', str(args.llm_latency))
+
+    latencies, elapsed = BENCHMARKS[pipeline](fakes, args)
+    from discord_agents.metrics import metrics
+    snapshot = metrics.snapshot()
+    return {
+        'pipeline': pipeline,
+        'requests': len(latencies),
+        'concurrency': args.concurrency,
+        'p50_seconds': percentile(latencies, 0.50),
+        'p95_seconds': percentile(latencies, 0.95),
+        'mean_seconds': statistics.mean(latencies) if latencies else None,
+        'throughput_per_second': len(latencies) / elapsed if elapsed else None,
+        'elapsed_seconds': elapsed,
+        'llm_calls': fakes.stats['llm_calls'],
+        'peak_rss_mb': peak_rss_mb(),
+        'counters': snapshot['counters'],
+        'stage_mean_seconds': {
+            key: histogram['sum'] / histogram['count']
+            for key, histogram in snapshot['histograms'].items() if histogram['count']
+        },
+    }
+
+
+def print_table(results):
+    header = f"{'pipeline':<10}{'requests':>9}{'p50 s':>9}{'p95 s':>9}{'req/s':>9}{'LLM calls':>11}{'peak RSS MB':>13}"
+    print(header)
+    print('-' * len(header))
+    for result in results:
+        if 'error' in result:
+            print(f"{result['pipeline']:<10} failed: {result['error']}")
+            continue
+        print(
+            f"{result['pipeline']:<10}{result['requests']:>9}{result['p50_seconds']:>9.2f}"
+            f"{result['p95_seconds']:>9.2f}{result['throughput_per_second']:>9.2f}"
+            f"{result['llm_calls']:>11}{result['peak_rss_mb']:>13.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the bots against local service stand-ins.')
+    parser.add_argument('--pipelines', '-p', default=','.join(PIPELINES), help='Comma separated pipelines to run')
+    parser.add_argument('--requests', '-n', type=int, default=20, help='Requests per pipeline')
+    parser.add_argument('--concurrency', '-c', type=int, default=4, help='Discord channels posting at once, or Nord analysis workers')
+    parser.add_argument('--llm-latency', type=float, default=0.5, help='Simulated seconds to the first generated token')
+    parser.add_argument('--rate-limited', type=float, default=0.0, help='Fraction of model calls rejected with a 429')
+    parser.add_argument('--discord-latency', type=float, default=0.05, help='Simulated seconds per Discord API call')
+    parser.add_argument('--edit-interval', type=float, default=0.2, help='Seconds between streamed message edits')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON lines')
+    parser.add_argument('--run', choices=PIPELINES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        # Child process: run a single pipeline and report on stdout
+        result = run_pipeline(args.run, args)
+        print(json.dumps(result))
+        return
+
+    results = []
+    passthrough = [arg for arg in sys.argv[1:] if arg != '--json']
+    for pipeline in args.pipelines.split(','):
+        process = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_bots', '--run', pipeline] + passthrough,
+            cwd=REPO_ROOT, capture_output=True, text=True,
+        )
+        lines = process.stdout.strip().splitlines()
+        if process.returncode != 0 or not lines:
+            results.append({'pipeline': pipeline, 'error': process.stderr.strip().splitlines()[-1:] or 'no output'})
+            continue
+        results.append(json.loads(lines[-1]))
+
+    if args.json:
+        for result in results:
+            print(json.dumps(result))
+    else:
+        print_table(results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""
+Cold-start benchmark for the bot entry points.
+
+Each script is imported (without connecting to Discord or running main()) in a
+fresh interpreter, several times, and the median import time and the RSS of
+that interpreter are reported. Pass --baseline to measure another git revision
+side by side, e.g. the commit before an import change:
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --baseline HEAD~1
+
+Use --fakes to swap the external SDKs for the stand-ins in benchmarks/fakes.py
+when they are not installed; that only measures the repository's own code.
+discord.Client.run is stubbed in both modes, since scripts from before the
+entry points were guarded call it at import time.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENTRY_POINTS = ['youtube-summarizer.py', 'podcast-summarizer.py', 'nord-news-bot.py']
+
+# Runs in the child interpreter; argv is the source tree, the script and whether to install the fakes
+CHILD = """
+import importlib.util, json, os, resource, sys, time
+start = time.perf_counter()
+root, script, use_fakes = sys.argv[1], sys.argv[2], sys.argv[3] == '1'
+sys.path.insert(0, root)
+if use_fakes:
+    # Always the current stand-ins, also when measuring an older tree
+    fakes_spec = importlib.util.spec_from_file_location('fakes', os.path.join(sys.argv[4], 'benchmarks', 'fakes.py'))
+    fakes = importlib.util.module_from_spec(fakes_spec)
+    fakes_spec.loader.exec_module(fakes)
+    fakes.install()
+path = os.path.join(root, script)
+with open(path, encoding='utf-8') as f:
+    uses_discord = 'import discord' in f.read()
+if uses_discord:
+    # Older trees call client.run() at import time; never connect
+    import discord
+    discord.Client.run = lambda self, *args, **kwargs: None
+heavy = ('vertexai', 'googleapiclient.discovery', 'playwright.async_api', 'youtube_transcript_api')
+spec = importlib.util.spec_from_file_location('entry_point', path)
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+elapsed = time.perf_counter() - start
+loaded = [name for name in heavy if name in sys.modules]
+print(json.dumps({
+    'seconds': elapsed,
+    'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'heavy_modules': loaded,
+}))
+"""
+
+
+def measure(root, script, runs, use_fakes):
+    """Imports script from root in `runs` fresh interpreters. Returns the median sample."""
+    samples = []
+    workdir = tempfile.mkdtemp(prefix='bench-startup-')
+    for _ in range(runs):
+        process = subprocess.run(
+            [sys.executable, '-c', CHILD, root, script, '1' if use_fakes else '0', REPO_ROOT],
+            cwd=workdir, capture_output=True, text=True,
+        )
+        if process.returncode != 0:
+            return {'error': (process.stderr.strip().splitlines() or ['no output'])[-1]}
+        samples.append(json.loads(process.stdout.strip().splitlines()[-1]))
+    median = statistics.median(sample['seconds'] for sample in samples)
+    return {
+        'seconds': median,
+        'rss_mb': statistics.median(sample['rss_mb'] for sample in samples),
+        'heavy_modules': samples[-1]['heavy_modules'],
+    }
+
+
+def export_revision(revision):
+    """Extracts a git revision into a temporary folder and returns its path."""
+    folder = tempfile.mkdtemp(prefix='bench-baseline-')
+    archive = subprocess.run(['git', 'archive', revision], cwd=REPO_ROOT, capture_output=True, check=True)
+    subprocess.run(['tar', '-x', '-C', folder], input=archive.stdout, check=True)
+    return folder
+
+
+def format_result(result):
+    if 'error' in result:
+        return f"failed: {result['error']}"
+    heavy = ', '.join(result['heavy_modules']) or '-'
+    return f"{result['seconds'] * 1000:8.0f} ms {result['rss_mb']:8.1f} MB   eager: {heavy}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure cold-start import time and memory of the bots.')
+    parser.add_argument('--runs', '-n', type=int, default=5, help='Fresh interpreters per entry point')
+    parser.add_argument('--baseline', '-b', help='Git revision to compare against, e.g. HEAD~1')
+    parser.add_argument('--fakes', action='store_true', help='Use the local SDK stand-ins')
+    parser.add_argument('--json', action='store_true', help='Print the results as JSON lines')
+    args = parser.parse_args()
+
+    trees = [('current', REPO_ROOT)]
+    if args.baseline:
+        trees.insert(0, (args.baseline, export_revision(args.baseline)))
+
+    for script in ENTRY_POINTS:
+        for label, root in trees:
+            result = measure(root, script, args.runs, args.fakes)
+            if args.json:
+                print(json.dumps({'entry_point': script, 'tree': label, **result}))
+            else:
+                print(f"{script:<24}{label:<10}{format_result(result)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+Measures how many input tokens transcript cleaning saves.
+
+The corpus is read from JSON files holding youtube_transcript_api entries,
+from the YouTube bot's transcript cache, or generated with the synthetic
+auto-captions in benchmarks/fakes.py when neither is given:
+
+    python -m benchmarks.bench_transcripts --cache cache/youtube.sqlite3
+    python -m benchmarks.bench_transcripts --corpus transcripts/ --summaries
+
+With --summaries every transcript is also summarized raw and cleaned, and the
+Participants/Summary/Quotes/Q&A sections of both summaries are compared. That
+needs Vertex AI credentials, or --fakes for a dry run.
+"""
+import argparse
+import importlib.util
+import json
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+import zlib
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from discord_agents.models import estimate_tokens
+from discord_agents.transcripts import clean_entries, transcript_text
+
+SECTIONS = ['Participants', 'Summary', 'Quotes', 'Q&A']
+_section_header = re.compile(r'^\s*(?:-\s*)?#{1,6}\s*(Participants|Summary|Quotes|Q&A)\b.*$', re.MULTILINE)
+
+
+def load_corpus(paths, cache_path, samples):
+    """Yields (name, entries) pairs."""
+    for path in paths:
+        files = sorted(os.path.join(path, name) for name in os.listdir(path)) if os.path.isdir(path) else [path]
+        for filename in files:
+            if filename.endswith('.json'):
+                with open(filename, 'r', encoding='utf-8') as f:
+                    yield os.path.basename(filename), json.load(f)
+    if cache_path:
+        connection = sqlite3.connect(cache_path)
+        for key, value in connection.execute("SELECT key, value FROM transcripts"):
+            yield key, json.loads(zlib.decompress(value))
+        connection.close()
+    if not paths and not cache_path:
+        from benchmarks.fakes import auto_captions
+        for i in range(samples):
+            yield f"synthetic-{i}", auto_captions(f"sample-{i}", 900)
+
+
+def section_lengths(summary):
+    """Returns the length in characters of each expected section, or None if it is missing."""
+    matches = list(_section_header.finditer(summary))
+    lengths = dict.fromkeys(SECTIONS)
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(summary)
+        lengths[match.group(1)] = len(summary[match.end():end].strip())
+    return lengths
+
+
+def load_bot(use_fakes):
+    if use_fakes:
+        from benchmarks import fakes
+        fakes.install()
+    os.chdir(tempfile.mkdtemp(prefix='bench-transcripts-'))
+    spec = importlib.util.spec_from_file_location('youtube_summarizer', os.path.join(REPO_ROOT, 'youtube-summarizer.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the tokens saved by transcript cleaning.')
+    parser.add_argument('--corpus', nargs='*', default=[], help='JSON transcript files or folders of them')
+    parser.add_argument('--cache', help="The YouTube bot's cache database, to use its cached transcripts")
+    parser.add_argument('--samples', type=int, default=10, help='Synthetic transcripts when no corpus is given')
+    parser.add_argument('--timestamps', type=float, default=60, help='Seconds between timestamp markers')
+    parser.add_argument('--summaries', action='store_true', help='Also compare raw and cleaned summaries')
+    parser.add_argument('--fakes', action='store_true', help='Use the local SDK stand-ins for --summaries')
+    args = parser.parse_args()
+
+    bot = load_bot(args.fakes) if args.summaries else None
+    total_raw = total_clean = 0
+    print(f"{'transcript':<28}{'raw tokens':>12}{'clean tokens':>14}{'saved':>8}")
+    for name, entries in load_corpus(args.corpus, args.cache, args.samples):
+        raw = ' '.join(entry['text'] for entry in entries)
+        clean = transcript_text(clean_entries(entries), args.timestamps)
+        raw_tokens, clean_tokens = estimate_tokens(raw), estimate_tokens(clean)
+        total_raw += raw_tokens
+        total_clean += clean_tokens
+        print(f"{name[:27]:<28}{raw_tokens:>12}{clean_tokens:>14}{1 - clean_tokens / max(raw_tokens, 1):>8.1%}")
+
+        if bot is not None:
+            raw_sections = section_lengths(bot._generate_summary(raw))
+            clean_sections = section_lengths(bot._generate_summary(clean))
+            for section in SECTIONS:
+                flag = '' if clean_sections[section] or not raw_sections[section] else '  <- missing after cleaning'
+                print(f"    {section:<14} raw {raw_sections[section] or 0:>6} chars, clean {clean_sections[section] or 0:>6} chars{flag}")
+
+    if total_raw:
+        print(f"{'total':<28}{total_raw:>12}{total_clean:>14}{1 - total_clean / total_raw:>8.1%}")
+
+
+if __name__ == '__main__':
+    main()
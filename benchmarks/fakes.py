@@ -0,0 +1,623 @@
+"""
+Local stand-ins for the external services the bots talk to.
+
+install() serves fake `vertexai`, `discord`, `youtube_transcript_api`,
+`googleapiclient`, `google.oauth2`, `playwright` and `requests` modules through
+an import hook, so the bot scripts can be imported and driven without network
+access or credentials. Latencies are taken from the module-level `config`.
+"""
+import asyncio
+import base64
+import enum
+import importlib.abc
+import importlib.util
+import random
+import sys
+import threading
+import time
+import types
+from email.mime.text import MIMEText
+
+
+class Config:
+    """Simulated service latencies, in seconds unless stated otherwise."""
+
+    llm_first_token = 0.5
+    llm_tokens_per_second = 400
+    llm_output_chars = 2400
+    llm_stream_chunk_chars = 200
+    # Fraction of model calls rejected with a 429 ResourceExhausted
+    llm_rate_limited = 0.0
+    transcript_latency = 0.3
+    transcript_entries = 600
+    metadata_latency = 0.1
+    discord_latency = 0.05
+    gmail_latency = 0.1
+    webhook_latency = 0.1
+    http_latency = 0.2
+    download_bytes = 2 * 1024 * 1024
+    download_bytes_per_second = 50 * 1024 * 1024
+
+
+config = Config()
+
+_stats_lock = threading.Lock()
+stats = {'llm_calls': 0, 'llm_input_chars': 0}
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+
+# ---------------------------------------------------------------- vertexai
+
+class HarmCategory(enum.Enum):
+    HARM_CATEGORY_HATE_SPEECH = 1
+    HARM_CATEGORY_DANGEROUS_CONTENT = 2
+    HARM_CATEGORY_SEXUALLY_EXPLICIT = 3
+    HARM_CATEGORY_HARASSMENT = 4
+
+
+class HarmBlockThreshold(enum.Enum):
+    BLOCK_MEDIUM_AND_ABOVE = 2
+
+
+class Part:
+    def __init__(self, data=None, uri=None, mime_type=None):
+        self.data = data
+        self.uri = uri
+        self.mime_type = mime_type
+
+    @classmethod
+    def from_data(cls, data, mime_type):
+        return cls(data=bytes(data), mime_type=mime_type)
+
+    @classmethod
+    def from_uri(cls, uri, mime_type):
+        return cls(uri=uri, mime_type=mime_type)
+
+
+class UsageMetadata:
+    def __init__(self, prompt_token_count, candidates_token_count):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+        self.total_token_count = prompt_token_count + candidates_token_count
+
+
+class GenerationResponse:
+    def __init__(self, text, usage_metadata=None):
+        self.text = text
+        self.usage_metadata = usage_metadata
+        content = types.SimpleNamespace(parts=[types.SimpleNamespace(text=text)])
+        self.candidates = [types.SimpleNamespace(content=content)]
+
+
+class ResourceExhausted(Exception):
+    """Stand-in for google.api_core.exceptions.ResourceExhausted."""
+
+    code = 429
+
+
+def _input_tokens(contents):
+    tokens = 0
+    for item in contents if isinstance(contents, list) else [contents]:
+        if isinstance(item, Part):
+            # Gemini bills audio at 32 tokens per second; assume 128 kbit/s MP3
+            size = len(item.data) if item.data is not None else 0
+            tokens += int(size / 16000 * 32)
+        else:
+            tokens += estimate_tokens(str(item))
+    return tokens
+
+
+def _summary_text():
+    body = ("Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 200)[:config.llm_output_chars]
+    section = max(1, len(body) // 4)
+    return "\n".join(
+        f"## {title}:\n{body[i * section:(i + 1) * section]}"
+        for i, title in enumerate(["Participants", "Summary", "Quotes", "Q&A"])
+    )
+
+
+class GenerativeModel:
+    def __init__(self, model_name, generation_config=None, safety_settings=None):
+        self._model_name = f"publishers/google/models/{model_name}"
+        self.generation_config = generation_config
+        self.safety_settings = safety_settings
+
+    def count_tokens(self, contents):
+        time.sleep(config.llm_first_token / 10)
+        return types.SimpleNamespace(total_tokens=_input_tokens(contents))
+
+    def generate_content(self, contents, generation_config=None, safety_settings=None, stream=False):
+        prompt_tokens = _input_tokens(contents)
+        if random.random() < config.llm_rate_limited:
+            time.sleep(config.llm_first_token / 10)
+            raise ResourceExhausted("429 Quota exceeded for aiplatform.googleapis.com/generate_content_requests_per_minute")
+        with _stats_lock:
+            stats['llm_calls'] += 1
+            stats['llm_input_chars'] += prompt_tokens * 4
+        text = _summary_text()
+        # Time to first token grows slowly with the input size
+        time.sleep(config.llm_first_token * (1 + prompt_tokens / 200000))
+        if not stream:
+            time.sleep(estimate_tokens(text) / config.llm_tokens_per_second)
+            return GenerationResponse(text, UsageMetadata(prompt_tokens, estimate_tokens(text)))
+        return self._stream(text, prompt_tokens)
+
+    def _stream(self, text, prompt_tokens):
+        size = config.llm_stream_chunk_chars
+        for start in range(0, len(text), size):
+            chunk = text[start:start + size]
+            time.sleep(estimate_tokens(chunk) / config.llm_tokens_per_second)
+            last = start + size >= len(text)
+            usage = UsageMetadata(prompt_tokens, estimate_tokens(text)) if last else None
+            yield GenerationResponse(chunk, usage)
+
+
+# ----------------------------------------------------------------- discord
+
+class Intents:
+    message_content = False
+
+    @classmethod
+    def default(cls):
+        return cls()
+
+
+class Embed:
+    def __init__(self, description=None):
+        self.description = description
+
+
+class FakeUser:
+    def __init__(self, name):
+        self.name = name
+
+
+class Client:
+    def __init__(self, intents=None):
+        self.intents = intents
+        self.user = FakeUser('bot')
+
+    def event(self, coro):
+        setattr(self, coro.__name__, coro)
+        return coro
+
+    def run(self, token):
+        raise RuntimeError("The benchmark drives on_message directly")
+
+
+class FakeMessage:
+    def __init__(self, channel, content, author=None):
+        self.channel = channel
+        self.content = content
+        self.author = author or FakeUser('0xedk')
+
+    async def edit(self, content=None, embeds=None):
+        await asyncio.sleep(config.discord_latency)
+        self.content = content
+        self.channel.touch()
+
+    async def delete(self):
+        await asyncio.sleep(config.discord_latency)
+        self.channel.touch()
+
+
+class FakeChannel:
+    """Records every API call so the benchmark can tell when a reply is complete."""
+
+    _next_id = 1
+
+    def __init__(self, name):
+        self.name = name
+        self.id = FakeChannel._next_id
+        FakeChannel._next_id += 1
+        self.calls = 0
+        self.last_activity = None
+        self.sent = []
+
+    def touch(self):
+        self.calls += 1
+        self.last_activity = time.perf_counter()
+
+    async def send(self, content=None, embeds=None):
+        await asyncio.sleep(config.discord_latency)
+        message = FakeMessage(self, content, FakeUser('bot'))
+        self.sent.append(message)
+        self.touch()
+        return message
+
+
+# ---------------------------------------------------- youtube_transcript_api
+
+CAPTION_WORDS = ['market', 'model', 'data', 'design', 'question', 'answer', 'research', 'product', 'team', 'idea',
+                 'growth', 'customer', 'price', 'risk', 'strategy', 'the', 'we', 'think', 'about', 'because']
+
+
+def auto_captions(seed, count):
+    """
+    Synthetic auto-generated captions: each line repeats the end of the
+    previous one, with the occasional [Music] marker, filler word and stutter.
+    """
+    rng = random.Random(seed)
+    entries = []
+    previous = []
+    for i in range(count):
+        if rng.random() < 0.05:
+            entries.append({'text': '[Music]', 'start': i * 4.0, 'duration': 4.0})
+            continue
+        words = [rng.choice(CAPTION_WORDS) for _ in range(8)]
+        if rng.random() < 0.3:
+            words.insert(rng.randrange(len(words)), rng.choice(['um', 'uh', 'you know']))
+        if rng.random() < 0.1:
+            position = rng.randrange(len(words))
+            words.insert(position, words[position])
+        entries.append({'text': ' '.join(previous[-4:] + words), 'start': i * 4.0, 'duration': 4.0})
+        previous = words
+    return entries
+
+
+class YouTubeTranscriptApi:
+    @staticmethod
+    def get_transcript(video_id):
+        time.sleep(config.transcript_latency)
+        return auto_captions(video_id, config.transcript_entries)
+
+
+# --------------------------------------------------------- googleapiclient
+
+class HttpError(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.resp = types.SimpleNamespace(status=status)
+
+
+class FakeRequest:
+    def __init__(self, result, latency):
+        self._result = result
+        self._latency = latency
+
+    def execute(self):
+        time.sleep(self._latency)
+        return self._result()
+
+
+class FakeBatch:
+    def __init__(self, callback):
+        self._callback = callback
+        self._requests = []
+
+    def add(self, request, request_id=None):
+        self._requests.append((request_id, request))
+
+    def execute(self):
+        time.sleep(config.gmail_latency)
+        for request_id, request in self._requests:
+            self._callback(request_id, request._result(), None)
+
+
+class FakeMailbox:
+    """An in-memory Gmail mailbox holding unread newsletter messages."""
+
+    def __init__(self, count=0, body_chars=6000):
+        self.messages = {}
+        self.unread = []
+        self.history_id = 1
+        # (history ID, message ID) of every added message, for history().list()
+        self.added = []
+        for i in range(count):
+            self.add(f"Newsletter {i}", f"Edição {i}. " + ("Mercado financeiro em foco. " * 400)[:body_chars])
+
+    def add(self, subject, body):
+        """Adds an HTML-only newsletter, with the layout, tracking links and footer real ones carry."""
+        msg_id = f"m{len(self.messages):05d}"
+        paragraphs = ''.join(
+            f'<tr><td style="padding:8px;font-family:Arial;color:#333"><p>{sentence}.</p>'
+            f'<a href="https://click.example.com/track?id={msg_id}&amp;p={i}">Leia mais</a></td></tr>'
+            for i, sentence in enumerate(body.split('. ')) if sentence
+        )
+        html = (
+            '<html><head><style>td { font-size: 14px; } .footer { color: #999; }</style></head><body>'
+            '<div style="display:none">Prévia do conteúdo desta edição</div>'
+            '<p><a href="https://example.com/view">Visualizar no navegador</a></p>'
+            f'<table width="600" cellpadding="0" cellspacing="0">{paragraphs}</table>'
+            '<p class="footer">Você está recebendo este e-mail porque se inscreveu. '
+            '<a href="https://example.com/unsubscribe">Descadastrar</a></p>'
+            '<p class="footer">Todos os direitos reservados.</p></body></html>'
+        )
+        message = MIMEText(html, 'html', 'utf-8')
+        message['Subject'] = subject
+        self.messages[msg_id] = base64.urlsafe_b64encode(message.as_bytes()).decode('ascii')
+        self.unread.append(msg_id)
+        self.history_id += 1
+        self.added.append((self.history_id, msg_id))
+        return msg_id
+
+
+class FakeGmailUsers:
+    def __init__(self, mailbox):
+        self.mailbox = mailbox
+
+    def messages(self):
+        return self
+
+    def labels(self):
+        return types.SimpleNamespace(list=lambda userId: FakeRequest(
+            lambda: {'labels': [{'id': 'Label_1', 'name': 'finance/nord'}]}, config.gmail_latency))
+
+    def history(self):
+        return types.SimpleNamespace(list=self._history)
+
+    def _history(self, userId, startHistoryId, labelId=None, historyTypes=None, pageToken=None):
+        def result():
+            records = [
+                {'id': str(history_id), 'messagesAdded': [{'message': {
+                    'id': msg_id,
+                    'labelIds': ['Label_1'] + (['UNREAD'] if msg_id in self.mailbox.unread else []),
+                }}]}
+                for history_id, msg_id in self.mailbox.added if history_id > int(startHistoryId)
+            ]
+            return {'history': records, 'historyId': str(self.mailbox.history_id)}
+        return FakeRequest(result, config.gmail_latency)
+
+    def getProfile(self, userId):
+        return FakeRequest(lambda: {'historyId': str(self.mailbox.history_id)}, config.gmail_latency)
+
+    def list(self, userId, q=None, pageToken=None):
+        start = int(pageToken or 0)
+        newest_first = list(reversed(self.mailbox.unread))
+
+        def result():
+            page = newest_first[start:start + 100]
+            response = {'messages': [{'id': msg_id} for msg_id in page]}
+            if start + 100 < len(newest_first):
+                response['nextPageToken'] = str(start + 100)
+            return response
+        return FakeRequest(result, config.gmail_latency)
+
+    def get(self, userId, id, format=None):
+        return FakeRequest(lambda: {'id': id, 'raw': self.mailbox.messages[id]}, config.gmail_latency)
+
+    def modify(self, userId, id, body):
+        return self.batchModify(userId, {'ids': [id], **body})
+
+    def batchModify(self, userId, body):
+        def result():
+            for msg_id in body['ids']:
+                if msg_id in self.mailbox.unread:
+                    self.mailbox.unread.remove(msg_id)
+            return {}
+        return FakeRequest(result, config.gmail_latency)
+
+
+class FakeGmailService:
+    def __init__(self, mailbox):
+        self.mailbox = mailbox
+
+    def users(self):
+        return FakeGmailUsers(self.mailbox)
+
+    def new_batch_http_request(self, callback=None):
+        return FakeBatch(callback)
+
+
+class FakeYouTubeService:
+    def videos(self):
+        return self
+
+    def list(self, part=None, id=None):
+        return FakeRequest(lambda: {'items': [{'snippet': {
+            'title': f"Video {id}",
+            'channelTitle': 'Benchmark Channel',
+            'publishedAt': '2024-06-01T12:00:00Z',
+        }}]}, config.metadata_latency)
+
+
+mailbox = FakeMailbox()
+
+
+def build(service_name, version, developerKey=None, credentials=None):
+    if service_name == 'gmail':
+        return FakeGmailService(mailbox)
+    return FakeYouTubeService()
+
+
+class Credentials:
+    scopes = []
+
+    @classmethod
+    def from_service_account_file(cls, path, scopes=None):
+        credentials = cls()
+        credentials.scopes = scopes
+        return credentials
+
+    def with_subject(self, subject):
+        return self
+
+
+# ---------------------------------------------------------------- requests
+
+class RequestException(IOError):
+    pass
+
+
+PODCAST_PAGE = """<html><head><meta property="og:title" content="Episode {n} - Benchmark Podcast"></head>
+<body><a class="download-button" href="/media/episode-{n}.mp3">Download</a>
+<span id="episode_date"> Jun {n}, 2024 </span></body></html>"""
+
+
+class FakeResponse:
+    def __init__(self, url, status_code=200, text='', content=b'', headers=None):
+        self.url = url
+        self.status_code = status_code
+        self.text = text
+        self.content = content
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RequestException(f"HTTP {self.status_code}")
+
+    def json(self):
+        raise ValueError("No JSON body")
+
+    def iter_content(self, chunk_size=8192):
+        for start in range(0, len(self.content), chunk_size):
+            chunk = self.content[start:start + chunk_size]
+            time.sleep(len(chunk) / config.download_bytes_per_second)
+            yield chunk
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def episode_audio(url):
+    """The bytes of a fake episode. A per-URL header keeps episodes from sharing a summary cache entry."""
+    header = url.encode('utf-8')
+    return header + b'\xff\xfb' * ((config.download_bytes - len(header)) // 2)
+
+
+def _audio_response(url, headers):
+    audio = episode_audio(url)
+    response_headers = {'Accept-Ranges': 'bytes', 'ETag': f'"{len(audio)}"'}
+    requested = headers.get('Range', '')
+    if requested.startswith('bytes='):
+        first, last = requested[len('bytes='):].split('-')
+        first, last = int(first), min(int(last or len(audio) - 1), len(audio) - 1)
+        response_headers.update({
+            'Content-Range': f"bytes {first}-{last}/{len(audio)}",
+            'Content-Length': str(last - first + 1),
+        })
+        return FakeResponse(url, status_code=206, content=audio[first:last + 1], headers=response_headers)
+    response_headers['Content-Length'] = str(len(audio))
+    return FakeResponse(url, content=audio, headers=response_headers)
+
+
+def _episode_number(url):
+    digits = ''.join(ch for ch in url.rsplit('/', 1)[-1] if ch.isdigit())
+    return digits or '1'
+
+
+class Session:
+    def __init__(self):
+        self.headers = {}
+
+    def mount(self, prefix, adapter):
+        pass
+
+    def get(self, url, headers=None, **kwargs):
+        time.sleep(config.http_latency)
+        if url.endswith('.mp3'):
+            return _audio_response(url, headers or {})
+        page = PODCAST_PAGE.format(n=_episode_number(url))
+        return FakeResponse(url, text=page, content=page.encode('utf-8'))
+
+    def head(self, url, **kwargs):
+        time.sleep(config.http_latency)
+        return FakeResponse(url, headers={'Content-Length': str(config.download_bytes)})
+
+    def post(self, url, json=None, **kwargs):
+        time.sleep(config.webhook_latency)
+        webhook_posts.append(json)
+        return FakeResponse(url, status_code=204)
+
+    def close(self):
+        pass
+
+
+webhook_posts = []
+_default_session = Session()
+
+
+def get(url, **kwargs):
+    return _default_session.get(url, **kwargs)
+
+
+def post(url, **kwargs):
+    return _default_session.post(url, **kwargs)
+
+
+def head(url, **kwargs):
+    return _default_session.head(url, **kwargs)
+
+
+class HTTPAdapter:
+    def __init__(self, **kwargs):
+        pass
+
+
+# -------------------------------------------------------------- playwright
+
+def async_playwright():
+    raise RuntimeError("The benchmark serves podcast pages over the HTTP fast path")
+
+
+# ------------------------------------------------------------------ wiring
+
+def _fake_modules():
+    generative_models = dict(
+        GenerativeModel=GenerativeModel, Part=Part, HarmCategory=HarmCategory,
+        HarmBlockThreshold=HarmBlockThreshold, FinishReason=enum.Enum('FinishReason', 'STOP'),
+    )
+    return {
+        'vertexai': dict(init=lambda project=None, location=None: None),
+        'vertexai.generative_models': generative_models,
+        'vertexai.preview': {},
+        'vertexai.preview.generative_models': generative_models,
+        'discord': dict(Intents=Intents, Client=Client, Embed=Embed, Message=FakeMessage),
+        'youtube_transcript_api': dict(YouTubeTranscriptApi=YouTubeTranscriptApi),
+        'googleapiclient': {},
+        'googleapiclient.discovery': dict(build=build),
+        'googleapiclient.errors': dict(HttpError=HttpError),
+        'google': {},
+        'google.api_core': {},
+        'google.api_core.exceptions': dict(ResourceExhausted=ResourceExhausted),
+        'google.oauth2': {},
+        'google.oauth2.service_account': dict(Credentials=Credentials),
+        'playwright': {},
+        'playwright.async_api': dict(async_playwright=async_playwright),
+        'requests': dict(
+            Session=Session, get=get, post=post, head=head,
+            RequestException=RequestException, Response=FakeResponse,
+        ),
+        'requests.exceptions': dict(RequestException=RequestException),
+        'requests.adapters': dict(HTTPAdapter=HTTPAdapter),
+    }
+
+
+# Names of the fake modules that have actually been imported so far
+installed = set()
+
+
+class FakeModuleFinder(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+    """Serves the fake modules on import, so lazily imported SDKs stay unloaded until used."""
+
+    def __init__(self, modules):
+        self.modules = modules
+
+    def find_spec(self, fullname, path, target=None):
+        if fullname in self.modules:
+            return importlib.util.spec_from_loader(fullname, self, is_package=True)
+        return None
+
+    def create_module(self, spec):
+        return None
+
+    def exec_module(self, module):
+        module.__dict__.update(self.modules[module.__name__])
+        installed.add(module.__name__)
+
+
+def install():
+    """Registers the fake modules. Call before importing any bot code."""
+    modules = _fake_modules()
+    for name in modules:
+        sys.modules.pop(name, None)
+    sys.meta_path.insert(0, FakeModuleFinder(modules))
@@ -0,0 +1,165 @@
+"""
+Audio ingestion for Gemini requests.
+
+Audio files are either staged once in Cloud Storage and passed to the model by
+URI, or read straight into a single inline Part. Inline reads are bounded by a
+shared memory budget so several episodes can be processed at once without the
+process running out of memory. Long files can be cut into overlapping time
+windows with ffmpeg so they can be summarized in parallel.
+"""
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import uuid
+from contextlib import contextmanager
+
+AUDIO_STAGING_BUCKET = os.getenv('PODCAST_AUDIO_BUCKET')
+AUDIO_MEMORY_LIMIT_MB = float(os.getenv('PODCAST_AUDIO_MEMORY_MB', '512'))
+# The file bytes and the request proto built from them are both alive while the
+# inline Part is constructed, so each inline file is charged twice its size.
+INLINE_COPIES = 2
+
+
+class MemoryBudget:
+    """
+    A counting semaphore over bytes, shared by the worker threads.
+    """
+
+    def __init__(self, limit_bytes):
+        self.limit_bytes = limit_bytes
+        self.used_bytes = 0
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def reserve(self, nbytes):
+        """Blocks until nbytes fit in the budget and releases them on exit."""
+        if nbytes > self.limit_bytes:
+            raise MemoryError(
+                f"{nbytes / 1024 / 1024:.0f} MB exceeds the audio memory budget of "
+                f"{self.limit_bytes / 1024 / 1024:.0f} MB; set PODCAST_AUDIO_BUCKET to pass audio by URI"
+            )
+        with self._condition:
+            self._condition.wait_for(lambda: self.used_bytes + nbytes <= self.limit_bytes)
+            self.used_bytes += nbytes
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.used_bytes -= nbytes
+                self._condition.notify_all()
+
+
+memory_budget = MemoryBudget(int(AUDIO_MEMORY_LIMIT_MB * 1024 * 1024))
+
+_storage_client = None
+_storage_lock = threading.Lock()
+
+
+def get_storage_client():
+    global _storage_client
+    with _storage_lock:
+        if _storage_client is None:
+            from google.cloud import storage
+            _storage_client = storage.Client(project=os.getenv('VERTEX_IA_PROJECT'))
+        return _storage_client
+
+
+@contextmanager
+def audio_part(path, mime_type="audio/mpeg", bucket=AUDIO_STAGING_BUCKET):
+    """
+    Yields a Part for an audio file, without any base64 round trip.
+
+    Args:
+        path (str): The local audio file.
+        mime_type (str): The audio MIME type.
+        bucket (str): Cloud Storage bucket to stage the file in. When set the
+            file is uploaded from disk and referenced by URI, and the staged
+            copy is deleted afterwards. Otherwise it is read inline.
+    """
+    from vertexai.generative_models import Part
+
+    if bucket:
+        blob = get_storage_client().bucket(bucket).blob(f"podcasts/{uuid.uuid4().hex}{os.path.splitext(path)[1]}")
+        blob.upload_from_filename(path, content_type=mime_type)
+        try:
+            yield Part.from_uri(f"gs://{bucket}/{blob.name}", mime_type=mime_type)
+        finally:
+            try:
+                blob.delete()
+            except Exception as e:
+                print(f"Error deleting staged audio gs://{bucket}/{blob.name}: {e}")
+        return
+
+    with memory_budget.reserve(os.path.getsize(path) * INLINE_COPIES):
+        with open(path, 'rb') as f:
+            data = f.read()
+        part = Part.from_data(data=data, mime_type=mime_type)
+        del data
+        yield part
+
+
+def segmenting_available():
+    """Returns True if ffmpeg and ffprobe are installed."""
+    return shutil.which('ffmpeg') is not None and shutil.which('ffprobe') is not None
+
+
+def audio_duration(path):
+    """Returns the duration of an audio file in seconds, using ffprobe."""
+    output = subprocess.run(
+        ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'csv=p=0', path],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return float(output.strip())
+
+
+def segment_windows(duration, segment_seconds, overlap_seconds):
+    """
+    Splits a duration into overlapping (start, end) windows.
+
+    The last window is merged into the previous one when it would be shorter
+    than the overlap, so no segment is just a few seconds long.
+    """
+    windows = []
+    start = 0.0
+    while start < duration:
+        end = min(start + segment_seconds, duration)
+        windows.append((start, end))
+        if end >= duration:
+            break
+        start = end - overlap_seconds
+    if len(windows) > 1 and windows[-1][1] - windows[-1][0] <= overlap_seconds:
+        windows[-2] = (windows[-2][0], windows.pop()[1])
+    return windows
+
+
+@contextmanager
+def audio_segments(path, segment_seconds, overlap_seconds):
+    """
+    Yields (start, end, segment_path) tuples covering the whole file.
+
+    Segments are cut without re-encoding into a temporary folder that is removed
+    on exit. Files no longer than one segment are yielded as-is.
+    """
+    duration = audio_duration(path)
+    windows = segment_windows(duration, segment_seconds, overlap_seconds)
+    if len(windows) == 1:
+        yield [(0.0, duration, path)]
+        return
+
+    folder = tempfile.mkdtemp(prefix='segments-')
+    try:
+        segments = []
+        extension = os.path.splitext(path)[1] or '.mp3'
+        for i, (start, end) in enumerate(windows):
+            segment_path = os.path.join(folder, f"{i:03d}{extension}")
+            subprocess.run(
+                ['ffmpeg', '-v', 'error', '-y', '-ss', f"{start:.3f}", '-t', f"{end - start:.3f}",
+                 '-i', path, '-c', 'copy', segment_path],
+                check=True, capture_output=True,
+            )
+            segments.append((start, end, segment_path))
+        yield segments
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
@@ -0,0 +1,206 @@
+"""
+On-disk caches shared by the bots.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from concurrent.futures import Future
+
+from discord_agents.metrics import metrics
+
+
+class DiskCache:
+    """
+    A SQLite-backed key/value cache with TTL and size-bounded LRU eviction.
+
+    Values are stored zlib-compressed. Several caches can share one database
+    file by using different table names. Instances are safe to use from the
+    worker threads. The database is only opened on first use, so importing a
+    bot does not create or open any cache file.
+    """
+
+    def __init__(self, path, table, ttl=None, max_bytes=None):
+        """
+        Args:
+            path (str): Path of the SQLite database file.
+            table (str): Table holding this cache's entries.
+            ttl (float): Seconds an entry stays valid, or None to never expire.
+            max_bytes (int): Compressed size budget, or None for no limit.
+        """
+        if not table.isidentifier():
+            raise ValueError(f"Invalid cache table name: {table}")
+        self.table = table
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = None
+
+    @property
+    def _conn(self):
+        """The database connection, opened on first use. Callers hold self._lock."""
+        if self._connection is None:
+            import sqlite3
+
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                "key TEXT PRIMARY KEY, value BLOB, size INTEGER, created REAL, accessed REAL)"
+            )
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_accessed ON {self.table} (accessed)")
+            conn.commit()
+            self._connection = conn
+        return self._connection
+
+    def get(self, key):
+        """Returns the cached bytes for key, or None if missing or expired."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, created FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created = row
+            if self.ttl is not None and now - created > self.ttl:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute(f"UPDATE {self.table} SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return zlib.decompress(value)
+
+    def set(self, key, value):
+        """Stores bytes under key, evicting least recently used entries if over budget."""
+        blob = zlib.compress(value)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, size, created, accessed) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, blob, len(blob), now, now),
+            )
+            if self.ttl is not None:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE created < ?", (now - self.ttl,))
+            if self.max_bytes is not None:
+                self._evict()
+            self._conn.commit()
+
+    def get_json(self, key):
+        value = self.get(key)
+        return json.loads(value) if value is not None else None
+
+    def set_json(self, key, value):
+        self.set(key, json.dumps(value).encode('utf-8'))
+
+    def _evict(self):
+        total = self._conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute(f"SELECT key, size FROM {self.table} ORDER BY accessed").fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            total -= size
+
+
+def content_key(*parts):
+    """
+    Builds a cache key from the hashes of its parts.
+
+    Args:
+        *parts: Strings, bytes or JSON-serialisable values such as a generation config.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode('utf-8')
+        elif not isinstance(part, bytes):
+            part = json.dumps(part, sort_keys=True, default=str).encode('utf-8')
+        digest.update(hashlib.sha256(part).digest())
+    return digest.hexdigest()
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """Returns the SHA-256 of a file without loading it into memory."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class SummaryCache:
+    """
+    Content-addressed cache for generated text with single-flight deduplication.
+
+    Keys should be built with content_key() from the input, the prompt, the
+    model name and the generation config, so changing any of them misses the
+    cache. While a key is being computed, other callers asking for the same
+    key wait for that result instead of issuing their own model call.
+    """
+
+    def __init__(self, path, ttl=None, max_bytes=None):
+        self.store = DiskCache(path, 'summaries', ttl=ttl, max_bytes=max_bytes)
+        self._lock = threading.Lock()
+        self._inflight = {}
+
+    def get_or_compute(self, key, compute, on_hit=None, cacheable=None):
+        """
+        Returns the cached text for key, computing and storing it if needed.
+
+        Args:
+            key (str): Cache key from content_key().
+            compute (callable): Zero-argument function returning the text.
+            on_hit (callable): Called with the text when it was not computed by
+                this call, e.g. to forward it to a stream that compute() would
+                otherwise have fed.
+            cacheable (callable): Asked after compute() whether its result may
+                be stored. Callers waiting on the same key still receive it.
+        """
+        result = self._get_or_compute(key, compute, cacheable)
+        metrics.count('summary_cache', result='miss' if result[1] else 'hit')
+        if on_hit is not None and not result[1]:
+            on_hit(result[0])
+        return result[0]
+
+    def _get_or_compute(self, key, compute, cacheable=None):
+        cached = self.store.get(key)
+        if cached is not None:
+            return cached.decode('utf-8'), False
+
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+        if not owner:
+            return future.result(), False
+
+        try:
+            # Another caller may have stored the result between our lookup and taking ownership
+            cached = self.store.get(key)
+            computed = cached is None
+            if computed:
+                result = compute()
+                if cacheable is None or cacheable():
+                    self.store.set(key, result.encode('utf-8'))
+            else:
+                result = cached.decode('utf-8')
+            future.set_result(result)
+            return result, computed
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
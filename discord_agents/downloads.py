@@ -0,0 +1,340 @@
+"""
+Bounded, resumable episode downloads.
+
+When the server supports range requests, episodes are fetched as fixed-size
+pieces over several parallel connections and written in large blocks into a
+partial file. Completed pieces are recorded next to it, so a failed or
+interrupted download resumes where it stopped instead of starting over. Every
+download is capped in size, the folder is kept under a disk quota, and files
+nobody is using any more are removed automatically.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from email.message import Message
+from urllib.parse import unquote, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from discord_agents.metrics import metrics
+
+DOWNLOAD_CONNECTIONS = int(os.getenv('PODCAST_DOWNLOAD_CONNECTIONS', '4'))
+DOWNLOAD_PIECE_MB = float(os.getenv('PODCAST_DOWNLOAD_PIECE_MB', '8'))
+DOWNLOAD_TIMEOUT = float(os.getenv('PODCAST_DOWNLOAD_TIMEOUT', '30'))
+DOWNLOAD_RETRIES = int(os.getenv('PODCAST_DOWNLOAD_RETRIES', '3'))
+MAX_DOWNLOAD_MB = float(os.getenv('PODCAST_MAX_DOWNLOAD_MB', '500'))
+DOWNLOAD_QUOTA_MB = float(os.getenv('PODCAST_DOWNLOAD_QUOTA_MB', '2048'))
+ORPHAN_HOURS = float(os.getenv('PODCAST_ORPHAN_HOURS', '6'))
+# Size of each read from the connection and write to disk
+WRITE_BUFFER_BYTES = 1024 * 1024
+PARTIAL_SUFFIX = '.part'
+STATE_SUFFIX = '.part.json'
+
+_content_range = re.compile(r'bytes\s+(\d+)-(\d+)/(\d+|\*)')
+
+
+class DownloadError(Exception):
+    """Raised when a download is refused or cannot be completed."""
+
+
+def safe_filename(content_disposition, url, default='episode.mp3'):
+    """
+    Picks a local filename from the Content-Disposition header or the URL path.
+
+    Only the last path component is kept and anything but letters, digits,
+    dots, dashes and underscores is replaced, so a hostile header cannot
+    escape the download folder or create hidden files.
+    """
+    name = None
+    if content_disposition:
+        message = Message()
+        message['Content-Disposition'] = content_disposition
+        # Handles quoting and RFC 2231 filename*=UTF-8''... values
+        name = message.get_filename()
+    if not name:
+        name = unquote(os.path.basename(urlparse(url).path))
+    name = name.replace('\\', '/').rsplit('/', 1)[-1]
+    name = re.sub(r'[^\w.-]', '_', name).strip('._')
+    stem, extension = os.path.splitext(name)
+    if not stem:
+        return default
+    return stem[:100] + (extension[:10] or os.path.splitext(default)[1])
+
+
+class Downloader:
+    """
+    Downloads files into a folder with a size cap and a folder quota.
+
+    Files returned by download() stay reserved until release() is called.
+    Anything else in the folder that is older than orphan_seconds, such as
+    leftovers from a crashed process or abandoned partial files, is removed on
+    the next download or when the quota would be exceeded. Younger files may
+    belong to another process sharing the folder and are left alone.
+    """
+
+    def __init__(self, folder, connections=DOWNLOAD_CONNECTIONS, piece_bytes=int(DOWNLOAD_PIECE_MB * 1024 * 1024),
+                 max_bytes=int(MAX_DOWNLOAD_MB * 1024 * 1024), quota_bytes=int(DOWNLOAD_QUOTA_MB * 1024 * 1024),
+                 orphan_seconds=ORPHAN_HOURS * 3600):
+        self.folder = folder
+        self.connections = connections
+        self.piece_bytes = piece_bytes
+        self.max_bytes = max_bytes
+        self.quota_bytes = quota_bytes
+        self.orphan_seconds = orphan_seconds
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=connections * 2)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._lock = threading.Lock()
+        self._url_locks = {}
+        self._active = set()
+        self._reserved = 0
+        os.makedirs(folder, exist_ok=True)
+
+    def download(self, url):
+        """
+        Downloads url into the folder.
+
+        Returns:
+            str: Path of the downloaded file. Pass it to release() when done.
+
+        Raises:
+            DownloadError: The file is too large, the quota is exhausted or the
+                transfer failed. Completed pieces are kept for the next attempt.
+        """
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()[:16]
+        partial = os.path.join(self.folder, f".{key}{PARTIAL_SUFFIX}")
+        state_path = os.path.join(self.folder, f".{key}{STATE_SUFFIX}")
+        self.cleanup()
+
+        with self._url_lock(key):
+            self._claim(partial, state_path)
+            try:
+                with metrics.span('download_file') as fields:
+                    return self._fetch(url, partial, state_path, fields)
+            finally:
+                self._unclaim(partial, state_path)
+
+    def release(self, path):
+        """Deletes a file returned by download()."""
+        with self._lock:
+            self._active.discard(path)
+        self._remove(path)
+
+    def cleanup(self, max_age=None):
+        """
+        Removes files that are not in use and older than max_age seconds.
+
+        Returns:
+            int: Bytes freed.
+        """
+        max_age = self.orphan_seconds if max_age is None else max_age
+        now = time.time()
+        freed = 0
+        for path, size, mtime in self._inactive_files():
+            if now - mtime >= max_age and self._remove(path):
+                freed += size
+        if freed:
+            metrics.count('download_orphan_bytes_removed', freed)
+        return freed
+
+    def _fetch(self, url, partial, state_path, fields):
+        # A one-byte range request tells us whether ranges work, the size and the final URL
+        probe = self.session.get(url, headers={'Range': 'bytes=0-0'}, stream=True, timeout=DOWNLOAD_TIMEOUT)
+        try:
+            probe.raise_for_status()
+            filename = safe_filename(probe.headers.get('Content-Disposition'), probe.url)
+            match = _content_range.match(probe.headers.get('Content-Range', ''))
+            ranged = probe.status_code == 206 and match is not None and match.group(3) != '*'
+            if probe.status_code == 206 and not ranged:
+                # Ranges work but the total size is unknown, so fetch the file in one piece
+                probe.close()
+                probe = self.session.get(url, stream=True, timeout=DOWNLOAD_TIMEOUT)
+                probe.raise_for_status()
+            if ranged:
+                size = int(match.group(3))
+            else:
+                size = int(probe.headers['Content-Length']) if probe.headers.get('Content-Length') else None
+            if size is not None and size > self.max_bytes:
+                raise DownloadError(f"{size / 1024 / 1024:.0f} MB exceeds the {self.max_bytes / 1024 / 1024:.0f} MB download limit")
+
+            with self._reservation(size or self.max_bytes):
+                fields.update(bytes=size, ranged=ranged)
+                if ranged:
+                    probe.close()
+                    validator = probe.headers.get('ETag') or probe.headers.get('Last-Modified')
+                    self._fetch_pieces(probe.url, partial, state_path, size, validator)
+                else:
+                    # The server sent the whole file, so keep reading this response
+                    self._fetch_stream(probe, partial)
+                # Still reserved until the file counts as in use, so the quota never misses it
+                return self._finish(partial, state_path, filename)
+        except requests.RequestException as e:
+            raise DownloadError(str(e)) from e
+        finally:
+            probe.close()
+
+    def _finish(self, partial, state_path, filename):
+        """Moves a completed partial file to its final name and marks it in use."""
+        stem, extension = os.path.splitext(filename)
+        path = os.path.join(self.folder, f"{stem}-{uuid.uuid4().hex[:8]}{extension}")
+        with self._lock:
+            os.replace(partial, path)
+            self._active.add(path)
+        self._remove(state_path)
+        return path
+
+    def _fetch_stream(self, response, partial):
+        written = 0
+        with open(partial, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=WRITE_BUFFER_BYTES):
+                written += len(chunk)
+                if written > self.max_bytes:
+                    raise DownloadError(f"Download exceeds the {self.max_bytes / 1024 / 1024:.0f} MB limit")
+                f.write(chunk)
+        metrics.count('download_bytes', written)
+        return written
+
+    def _fetch_pieces(self, url, partial, state_path, size, validator):
+        pieces = [(start, min(start + self.piece_bytes, size) - 1) for start in range(0, size, self.piece_bytes)]
+        state = self._load_state(state_path)
+        if state.get('size') != size or state.get('validator') != validator or not os.path.exists(partial):
+            # Nothing to resume, or the file changed on the server since the last attempt
+            state = {'size': size, 'validator': validator, 'done': []}
+            with open(partial, 'wb') as f:
+                f.truncate(size)
+            self._save_state(state_path, state)
+        done = set(state['done'])
+        todo = [i for i in range(len(pieces)) if i not in done]
+        if done:
+            metrics.count('download_resumed_bytes', sum(pieces[i][1] - pieces[i][0] + 1 for i in done))
+        if not todo:
+            return
+        state_lock = threading.Lock()
+
+        def fetch(i):
+            self._fetch_piece(url, partial, pieces[i][0], pieces[i][1], validator)
+            with state_lock:
+                state['done'].append(i)
+                self._save_state(state_path, state)
+
+        with ThreadPoolExecutor(max_workers=min(self.connections, len(todo)), thread_name_prefix='download') as pool:
+            list(pool.map(fetch, todo))
+
+    def _fetch_piece(self, url, partial, start, end, validator):
+        headers = {'Range': f"bytes={start}-{end}"}
+        if validator:
+            # The server answers 200 instead of 206 if the file changed
+            headers['If-Range'] = validator
+        for attempt in range(DOWNLOAD_RETRIES + 1):
+            try:
+                with self.session.get(url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+                    response.raise_for_status()
+                    if response.status_code != 206:
+                        raise DownloadError("The file changed on the server during the download")
+                    remaining = end - start + 1
+                    with open(partial, 'r+b') as f:
+                        f.seek(start)
+                        for chunk in response.iter_content(chunk_size=WRITE_BUFFER_BYTES):
+                            f.write(chunk[:remaining])
+                            remaining -= len(chunk[:remaining])
+                            if not remaining:
+                                break
+                metrics.count('download_bytes', end - start + 1 - remaining)
+                if not remaining:
+                    return
+                error = f"connection closed with {remaining} bytes left"
+            except requests.RequestException as e:
+                error = str(e)
+            print(f"Error downloading bytes {start}-{end} (attempt {attempt + 1}): {error}")
+            if attempt < DOWNLOAD_RETRIES:
+                time.sleep(min(10, 2 ** attempt))
+        raise DownloadError(f"Giving up on bytes {start}-{end} of {url}")
+
+    @contextmanager
+    def _reservation(self, nbytes):
+        """Reserves nbytes of the folder quota for the duration of a download."""
+        self._reserve(nbytes)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._reserved -= nbytes
+
+    def _reserve(self, nbytes):
+        with self._lock:
+            used = self._usage() + self._reserved
+            if used + nbytes > self.quota_bytes:
+                # Make room by removing unused files, oldest first, with the same age limit as cleanup()
+                now = time.time()
+                for path, size, mtime in sorted(self._inactive_files(), key=lambda item: item[2]):
+                    if used + nbytes <= self.quota_bytes or now - mtime < self.orphan_seconds:
+                        break
+                    if self._remove(path):
+                        used -= size
+                        metrics.count('download_orphan_bytes_removed', size)
+            if used + nbytes > self.quota_bytes:
+                raise DownloadError(
+                    f"Download folder quota of {self.quota_bytes / 1024 / 1024:.0f} MB is full, try again later"
+                )
+            self._reserved += nbytes
+
+    def _usage(self):
+        """Bytes on disk, not counting partial files of running downloads, which are reserved instead."""
+        return sum(size for path, size, _ in self._files() if path not in self._active or not path.endswith(PARTIAL_SUFFIX))
+
+    def _files(self):
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    stat = entry.stat()
+                    yield entry.path, stat.st_size, stat.st_mtime
+
+    def _inactive_files(self):
+        active = set(self._active)
+        return [item for item in self._files() if item[0] not in active]
+
+    def _claim(self, *paths):
+        with self._lock:
+            self._active.update(paths)
+
+    def _unclaim(self, *paths):
+        with self._lock:
+            self._active.difference_update(paths)
+
+    def _url_lock(self, key):
+        with self._lock:
+            return self._url_locks.setdefault(key, threading.Lock())
+
+    @staticmethod
+    def _load_state(state_path):
+        try:
+            with open(state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _save_state(state_path, state):
+        temporary = f"{state_path}.tmp"
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(temporary, state_path)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            print(f"Error removing file: {path} - {e}")
+            return False
@@ -0,0 +1,162 @@
+"""
+Compact text extraction from newsletter emails.
+
+Newsletters usually carry a text/plain alternative next to the HTML one, and
+the HTML one is mostly inline CSS, tracking links and layout tables. The
+plain text part is preferred; HTML is only converted when there is no usable
+plain text. Each part is decoded with its declared charset, and the
+unsubscribe and legal footers are dropped before the text reaches the model.
+"""
+import re
+from html.parser import HTMLParser
+
+# A text/plain part shorter than this is usually just "view this email in your browser"
+MIN_PLAIN_TEXT_CHARS = 200
+# Extracted text shorter than this means the conversion went wrong; the part is sent as it is
+MIN_EXTRACTED_CHARS = 50
+
+SKIPPED_ELEMENTS = {'head', 'style', 'script', 'title', 'noscript', 'template', 'svg'}
+BLOCK_ELEMENTS = {
+    'address', 'article', 'blockquote', 'br', 'dd', 'div', 'dl', 'dt', 'footer', 'h1', 'h2', 'h3', 'h4', 'h5',
+    'h6', 'header', 'hr', 'li', 'ol', 'p', 'pre', 'section', 'table', 'td', 'th', 'tr', 'ul',
+}
+VOID_ELEMENTS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'}
+
+# Lines that start the footer of a newsletter, in Portuguese and English
+_footer_start = re.compile(
+    r'(descadastr|cancelar (a )?inscri|deixar de receber|n[aã]o deseja mais receber|voc[eê] est[aá] recebendo'
+    r'|este e-?mail foi enviado|todos os direitos reservados|unsubscribe|you are receiving|you received this'
+    r'|manage (your )?preferences|all rights reserved|update your preferences)',
+    re.IGNORECASE,
+)
+# Lines that are boilerplate wherever they appear
+_boilerplate_line = re.compile(
+    r'^\s*(visualizar (este e-?mail )?no navegador|ver (este e-?mail )?no navegador|abrir no navegador'
+    r'|view (this email )?in (your )?browser|view online|adicione .{0,60} (aos|à sua lista de) contatos'
+    r'|add .{0,60} to your (address book|contacts))\W*$',
+    re.IGNORECASE,
+)
+_url = re.compile(r'<?https?://\S+>?')
+_blank_lines = re.compile(r'\n\s*\n+')
+_spaces = re.compile(r'[ \t\u00a0\u200b\u200c\u200d\ufeff]+')
+
+
+class HTMLTextExtractor(HTMLParser):
+    """Collects the visible text of an HTML email, one line per block element."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self._skip_depth = 0
+        # Tag names of the open hidden elements, and of same-named elements nested in them
+        self._hidden = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_ELEMENTS:
+            self._skip_depth += 1
+            return
+        if tag in VOID_ELEMENTS:
+            if tag in BLOCK_ELEMENTS:
+                self.parts.append('\n')
+            return
+        style = (dict(attrs).get('style') or '').replace(' ', '').lower()
+        # Hidden preheaders and tracking blocks
+        if 'display:none' in style or (self._hidden and tag == self._hidden[-1]):
+            self._hidden.append(tag)
+        if tag in BLOCK_ELEMENTS:
+            self.parts.append('\n- ' if tag == 'li' else '\n')
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_ELEMENTS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+            return
+        if tag in VOID_ELEMENTS:
+            return
+        # Unclosed <p>, <li> or <td> inside a hidden element must not keep the rest hidden
+        if tag in self._hidden:
+            del self._hidden[len(self._hidden) - 1 - self._hidden[::-1].index(tag):]
+        if tag in BLOCK_ELEMENTS:
+            self.parts.append('\n')
+
+    def handle_data(self, data):
+        if not self._skip_depth and not self._hidden:
+            self.parts.append(data)
+
+    def text(self):
+        return ''.join(self.parts)
+
+
+def html_to_text(html):
+    """Converts an HTML document to plain text, dropping markup, styles and links."""
+    parser = HTMLTextExtractor()
+    parser.feed(html)
+    parser.close()
+    return parser.text()
+
+
+def part_text(part):
+    """Decodes a MIME part's payload with its declared charset."""
+    payload = part.get_payload(decode=True)
+    if payload is None:
+        return ''
+    charset = part.get_content_charset() or 'utf-8'
+    try:
+        return payload.decode(charset, errors='replace')
+    except LookupError:
+        # Unknown charset name; most newsletters that mislabel it are UTF-8 anyway
+        return payload.decode('utf-8', errors='replace')
+
+
+def _text_parts(message, content_type):
+    return [
+        part for part in message.walk()
+        if part.get_content_type() == content_type and part.get_content_disposition() != 'attachment'
+    ]
+
+
+def compact_text(text):
+    """Drops URLs, boilerplate lines and the footer, and collapses whitespace."""
+    lines = []
+    for line in _url.sub('', text).split('\n'):
+        line = _spaces.sub(' ', line).strip()
+        if _boilerplate_line.match(line) or line in ('-', '|'):
+            continue
+        lines.append(line)
+    text = '\n'.join(lines)
+    # Only treat a match as the footer when it is in the last third of the email. Characters
+    # rather than lines, since some newsletters put whole paragraphs on one line.
+    footer = _footer_start.search(text, len(text) * 2 // 3)
+    if footer:
+        # Cut at the start of the line or sentence holding the match
+        line_start = text.rfind('\n', 0, footer.start())
+        sentence_end = text.rfind('. ', 0, footer.start())
+        text = text[:sentence_end + 1] if sentence_end > line_start else text[:max(line_start, 0)]
+    return _blank_lines.sub('\n\n', text).strip()
+
+
+def extract_text(message):
+    """
+    Returns the compact body text of an email.Message.
+
+    The text/plain alternative is used when it has real content, otherwise
+    the HTML parts are converted to text. If that leaves next to nothing, the
+    first text part is returned as it is, as before extraction.
+    """
+    plain = '\n\n'.join(part_text(part) for part in _text_parts(message, 'text/plain'))
+    plain = compact_text(plain)
+    if len(plain) >= MIN_PLAIN_TEXT_CHARS:
+        return plain
+    html = '\n\n'.join(html_to_text(part_text(part)) for part in _text_parts(message, 'text/html'))
+    html = compact_text(html)
+    text = html if len(html) > len(plain) else plain
+    if len(text) < MIN_EXTRACTED_CHARS:
+        return first_text_part(message) or text
+    return text
+
+
+def first_text_part(message):
+    """The first text/plain or text/html part, undecoded beyond its charset, as sent before extraction."""
+    for part in message.walk():
+        if part.get_content_type() in ('text/plain', 'text/html'):
+            return part_text(part)
+    return ''
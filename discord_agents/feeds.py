@@ -0,0 +1,277 @@
+"""
+Podcast RSS/Atom feed polling.
+
+Feeds are fetched with conditional GETs (If-None-Match/If-Modified-Since), so
+an unchanged feed costs one 304 response. Changed feeds are parsed with an
+incremental XML parser as the body arrives, and each episode element is
+dropped once read, so feeds with years of episodes are never held in memory
+as a whole tree. The audio enclosure of an episode goes straight to the
+downloader, without rendering the episode page in a browser.
+
+The validators, the episodes waiting to be summarized and the GUIDs of the
+episodes already handled are kept in the podcast bot's cache database.
+"""
+import os
+import threading
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+
+import requests
+
+from discord_agents.cache import DiskCache
+from discord_agents.metrics import metrics
+
+FEED_TIMEOUT = float(os.getenv('PODCAST_FEED_TIMEOUT', '30'))
+FEED_MAX_MB = float(os.getenv('PODCAST_FEED_MAX_MB', '50'))
+# Newest episodes summarized when a feed is polled for the first time; older ones are only recorded
+FEED_BACKFILL = int(os.getenv('PODCAST_FEED_BACKFILL', '1'))
+# Failed episodes are retried on the next polls, up to this many attempts in total
+FEED_MAX_ATTEMPTS = int(os.getenv('PODCAST_FEED_MAX_ATTEMPTS', '3'))
+READ_CHUNK_BYTES = 64 * 1024
+
+ATOM_NS = 'http://www.w3.org/2005/Atom'
+
+
+class FeedError(Exception):
+    """Raised when a feed cannot be fetched or parsed."""
+
+
+def _split_tag(tag):
+    """Returns (namespace, local name) of an ElementTree tag."""
+    if tag.startswith('{'):
+        namespace, _, name = tag[1:].partition('}')
+        return namespace, name
+    return '', tag
+
+
+def _child_text(element, name, namespace=''):
+    child = element.find(f'{{{namespace}}}{name}' if namespace else name)
+    return child.text.strip() if child is not None and child.text else None
+
+
+def parse_date(value):
+    """Parses an RSS (RFC 822) or Atom (ISO 8601) date. Returns a datetime or None."""
+    if not value:
+        return None
+    try:
+        return parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+
+
+def episode_result(podcast_title, guid, title, date, download_url):
+    """
+    Builds an episode dict with the same keys as the scraped podcast info.
+
+    Returns:
+        dict: guid, podcast_title, episode_title, download_url, release_date
+        and published (a timestamp used for ordering), or None without audio.
+    """
+    if not download_url:
+        return None
+    published = parse_date(date)
+    return {
+        'guid': guid or download_url,
+        'podcast_title': podcast_title or 'N/A',
+        'episode_title': title or 'N/A',
+        'download_url': download_url,
+        'release_date': published.strftime('%Y-%m-%d') if published else (date or 'N/A'),
+        'published': published.timestamp() if published else 0,
+    }
+
+
+class FeedParser:
+    """
+    Incremental RSS 2.0 and Atom parser.
+
+    feed() takes the body as it arrives and returns the episodes completed by
+    that piece, in feed order.
+    """
+
+    def __init__(self):
+        self._parser = ET.XMLPullParser(events=('start', 'end'))
+        self._stack = []
+        self.podcast_title = None
+
+    def feed(self, data):
+        try:
+            self._parser.feed(data)
+        except ET.ParseError as e:
+            raise FeedError(f"Invalid feed XML: {e}") from e
+        return self._read_events()
+
+    def close(self):
+        try:
+            self._parser.close()
+        except ET.ParseError as e:
+            raise FeedError(f"Invalid feed XML: {e}") from e
+        return self._read_events()
+
+    def _read_events(self):
+        episodes = []
+        for event, element in self._parser.read_events():
+            if event == 'start':
+                self._stack.append(element)
+                continue
+            self._stack.pop()
+            namespace, name = _split_tag(element.tag)
+            parent = _split_tag(self._stack[-1].tag) if self._stack else None
+            if name == 'title' and parent in (('', 'channel'), (ATOM_NS, 'feed')) and self.podcast_title is None:
+                self.podcast_title = (element.text or '').strip()
+            elif (namespace, name) in (('', 'item'), (ATOM_NS, 'entry')):
+                episode = self._rss_item(element) if name == 'item' else self._atom_entry(element)
+                if episode:
+                    episodes.append(episode)
+                # Read episodes are dropped so the tree never grows with the feed
+                if self._stack:
+                    self._stack[-1].remove(element)
+        return episodes
+
+    def _rss_item(self, item):
+        enclosure = item.find('enclosure')
+        audio = enclosure is not None and (enclosure.get('type') or 'audio/').startswith('audio/')
+        return episode_result(
+            self.podcast_title,
+            _child_text(item, 'guid') or _child_text(item, 'link'),
+            _child_text(item, 'title'),
+            _child_text(item, 'pubDate'),
+            enclosure.get('url') if audio else None,
+        )
+
+    def _atom_entry(self, entry):
+        download_url = None
+        for link in entry.findall(f'{{{ATOM_NS}}}link'):
+            if link.get('rel') == 'enclosure' and (link.get('type') or 'audio/').startswith('audio/'):
+                download_url = link.get('href')
+                break
+        return episode_result(
+            self.podcast_title,
+            _child_text(entry, 'id', ATOM_NS),
+            _child_text(entry, 'title', ATOM_NS),
+            _child_text(entry, 'published', ATOM_NS) or _child_text(entry, 'updated', ATOM_NS),
+            download_url,
+        )
+
+
+class FeedPoller:
+    """
+    Polls feeds and keeps track of which of their episodes are still to be summarized.
+
+    Args:
+        cache_path (str): SQLite database holding the feed state.
+        session (requests.Session): Session used for the feed requests.
+    """
+
+    def __init__(self, cache_path, session=None, backfill=FEED_BACKFILL, max_attempts=FEED_MAX_ATTEMPTS):
+        self.feeds = DiskCache(cache_path, 'feeds')
+        self.episodes = DiskCache(cache_path, 'feed_episodes')
+        self.session = session or requests.Session()
+        self.backfill = backfill
+        self.max_attempts = max_attempts
+        # poll() and complete() both rewrite a feed's state
+        self._lock = threading.Lock()
+
+    def fetch(self, url, etag=None, last_modified=None):
+        """
+        Fetches and parses a feed unless it is unchanged since the validators.
+
+        Returns:
+            tuple: (episodes, etag, last_modified), or None if not modified.
+        """
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        with metrics.span('feed', url=url) as fields:
+            try:
+                response = self.session.get(url, headers=headers, timeout=FEED_TIMEOUT, stream=True)
+            except requests.RequestException as e:
+                raise FeedError(f"Error fetching {url}: {e}") from e
+            with response:
+                fields['status'] = response.status_code
+                if response.status_code == 304:
+                    metrics.count('feed_not_modified')
+                    return None
+                if response.status_code >= 400:
+                    raise FeedError(f"Error fetching {url}: HTTP {response.status_code}")
+                parser = FeedParser()
+                episodes = []
+                size = 0
+                try:
+                    for chunk in response.iter_content(READ_CHUNK_BYTES):
+                        size += len(chunk)
+                        if size > FEED_MAX_MB * 1024 * 1024:
+                            raise FeedError(f"{url} is larger than {FEED_MAX_MB:g} MB")
+                        episodes.extend(parser.feed(chunk))
+                except requests.RequestException as e:
+                    raise FeedError(f"Error reading {url}: {e}") from e
+                episodes.extend(parser.close())
+                fields['bytes'] = size
+                fields['episodes'] = len(episodes)
+                metrics.count('feed_bytes', size)
+            return episodes, response.headers.get('ETag'), response.headers.get('Last-Modified')
+
+    def poll(self, url):
+        """
+        Fetches a feed and returns its episodes still to be summarized, oldest first.
+
+        Episodes returned by an earlier poll stay in the list until complete()
+        is called for them, so they survive 304 responses and restarts.
+        """
+        with self._lock:
+            state = self.feeds.get_json(url)
+        first_poll = state is None
+        state = state or {'pending': []}
+        result = self.fetch(url, state.get('etag'), state.get('last_modified'))
+        with self._lock:
+            state = self.feeds.get_json(url) or state
+            if result is not None:
+                episodes, state['etag'], state['last_modified'] = result
+                known = {episode['guid'] for episode in state['pending']}
+                new = [
+                    episode for episode in reversed(episodes)
+                    if episode['guid'] not in known and self.episodes.get(self._key(url, episode['guid'])) is None
+                ]
+                # Feeds are usually newest first, but not always
+                new.sort(key=lambda episode: episode['published'])
+                if first_poll and len(new) > self.backfill:
+                    skipped, new = new[:len(new) - self.backfill], new[len(new) - self.backfill:]
+                    for episode in skipped:
+                        self._record(url, episode, 'skipped')
+                    print(f"Subscribed to {url}: {len(skipped)} older episodes skipped")
+                state['pending'] += [{**episode, 'attempts': 0} for episode in new]
+                self.feeds.set_json(url, state)
+            return list(state['pending'])
+
+    def complete(self, url, episode, succeeded):
+        """Records the outcome of summarizing an episode returned by poll()."""
+        with self._lock:
+            state = self.feeds.get_json(url)
+            if state is None:
+                return
+            for pending in state['pending']:
+                if pending['guid'] != episode['guid']:
+                    continue
+                pending['attempts'] += 1
+                if succeeded or pending['attempts'] >= self.max_attempts:
+                    state['pending'].remove(pending)
+                    self._record(url, pending, 'done' if succeeded else 'failed')
+                break
+            self.feeds.set_json(url, state)
+
+    def _record(self, url, episode, status):
+        metrics.count('feed_episodes', status=status)
+        self.episodes.set_json(self._key(url, episode['guid']), {
+            'title': episode['episode_title'], 'status': status, 'time': time.time(),
+        })
+
+    @staticmethod
+    def _key(url, guid):
+        return f"{url} {guid}"
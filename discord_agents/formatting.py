@@ -0,0 +1,122 @@
+"""
+Text formatting and Discord output helpers shared by the bots.
+
+Long replies are packed into as few messages as possible. Breaks are placed
+between markdown sections when that does not cost an extra message, otherwise
+between lines, and only words longer than a whole message are ever cut.
+"""
+import os
+import re
+
+from discord_agents.metrics import metrics
+
+MESSAGE_LIMIT = 2000
+EMBED_DESCRIPTION_LIMIT = 4096
+# Discord caps the combined text of all embeds in one message, and their number
+EMBEDS_TOTAL_LIMIT = 6000
+EMBEDS_PER_MESSAGE = 10
+USE_EMBEDS = os.getenv('BOT_USE_EMBEDS', 'false').lower() in ('1', 'true', 'yes')
+
+_section_header = re.compile(r'^\s*(?:-\s*)?#{1,6}\s')
+
+
+def format_offset(seconds):
+    """Formats a media offset in seconds as H:MM:SS."""
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:d}:{minutes:02d}:{seconds:02d}"
+
+
+def _pack(pieces, limit, separator):
+    """Greedily joins consecutive pieces while the result stays within limit."""
+    packed = []
+    current = None
+    for piece in pieces:
+        candidate = piece if current is None else f"{current}{separator}{piece}"
+        if len(candidate) <= limit:
+            current = candidate
+        else:
+            if current is not None:
+                packed.append(current)
+            current = piece
+    if current is not None:
+        packed.append(current)
+    return packed
+
+
+def _split_line(line, limit):
+    if len(line) <= limit:
+        return [line]
+    words = []
+    for word in line.split(' '):
+        words.extend(word[i:i + limit] for i in range(0, max(len(word), 1), limit))
+    return _pack(words, limit, ' ')
+
+
+def _pack_lines(text, limit):
+    lines = [piece for line in text.split('\n') for piece in _split_line(line, limit)]
+    return _pack(lines, limit, '\n')
+
+
+def _sections(text):
+    sections = []
+    for line in text.split('\n'):
+        if sections and not _section_header.match(line):
+            sections[-1] += '\n' + line
+        else:
+            sections.append(line)
+    return sections
+
+
+def pack_message(text, limit=MESSAGE_LIMIT):
+    """
+    Splits text into the fewest chunks of at most limit characters.
+
+    Returns:
+        list: The non-blank chunks, in order.
+    """
+    by_line = _pack_lines(text, limit)
+    by_section = _pack([piece for section in _sections(text) for piece in _pack_lines(section, limit)], limit, '\n')
+    chunks = by_section if len(by_section) <= len(by_line) else by_line
+    return [chunk for chunk in chunks if chunk.strip()]
+
+
+def pack_embeds(text):
+    """
+    Packs text into embed descriptions, grouped into as few messages as possible.
+
+    Returns:
+        list: One list of descriptions per message.
+    """
+    messages = []
+    for description in pack_message(text, EMBED_DESCRIPTION_LIMIT):
+        if (messages and len(messages[-1]) < EMBEDS_PER_MESSAGE
+                and sum(map(len, messages[-1])) + len(description) <= EMBEDS_TOTAL_LIMIT):
+            messages[-1].append(description)
+        else:
+            messages.append([description])
+    return messages
+
+
+async def send_long_message(channel, message, embeds=USE_EMBEDS):
+    """
+    Sends a long message to a Discord channel using as few API calls as possible.
+
+    Args:
+        channel: The Discord channel.
+        message (str): The text to send.
+        embeds (bool): Send the text as embed descriptions (4096 characters
+            each, up to 6000 per message) instead of plain 2000 character messages.
+    """
+    with metrics.span('discord_send', embeds=embeds) as fields:
+        if embeds:
+            import discord
+            pages = pack_embeds(message)
+            for descriptions in pages:
+                await channel.send(embeds=[discord.Embed(description=description) for description in descriptions])
+        else:
+            pages = pack_message(message)
+            for chunk in pages:
+                await channel.send(chunk)
+        fields['messages'] = len(pages)
+    metrics.count('discord_messages', len(pages))
@@ -0,0 +1,128 @@
+"""
+Background job handling for the Discord bots.
+
+Blocking SDK calls (transcripts, downloads, Gemini) run on a shared thread pool
+so the gateway heartbeat never stalls, and each channel gets its own FIFO queue
+so requests posted in one channel are answered in the order they arrived.
+"""
+import asyncio
+import functools
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from discord_agents.metrics import metrics
+
+MAX_WORKERS = int(os.getenv('BOT_MAX_WORKERS', '8'))
+MAX_PENDING_JOBS = int(os.getenv('BOT_MAX_PENDING_JOBS', '50'))
+
+# Default number of concurrent calls per pipeline stage. Each one can be
+# overridden with BOT_<STAGE>_CONCURRENCY, e.g. BOT_LLM_CONCURRENCY=2.
+DEFAULT_STAGE_CONCURRENCY = {
+    'transcript': 4,
+    'metadata': 4,
+    'download': 2,
+    'llm': 3,
+    # /ask answers get their own slots so they never queue behind summaries
+    'ask': 3,
+}
+
+executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='bot-worker')
+
+_stage_limits = {}
+
+
+def stage_limit(stage):
+    """Returns the semaphore bounding concurrent calls for a pipeline stage."""
+    if stage not in _stage_limits:
+        default = DEFAULT_STAGE_CONCURRENCY.get(stage, MAX_WORKERS)
+        limit = int(os.getenv(f'BOT_{stage.upper()}_CONCURRENCY', default))
+        _stage_limits[stage] = asyncio.Semaphore(limit)
+    return _stage_limits[stage]
+
+
+async def run_blocking(stage, func, *args, **kwargs):
+    """
+    Runs a blocking function on the worker pool without blocking the event loop.
+
+    The time spent waiting for a free slot and the time spent running are
+    recorded separately, under the stage name.
+
+    Args:
+        stage (str): Pipeline stage name, used to pick the concurrency limit.
+        func (callable): The blocking function to run.
+    """
+    queued = time.perf_counter()
+    async with stage_limit(stage):
+        metrics.observe('stage_wait_seconds', time.perf_counter() - queued, stage=stage)
+        loop = asyncio.get_running_loop()
+        with metrics.span(stage, job=getattr(func, '__name__', type(func).__name__)):
+            return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+
+
+class QueueFull(Exception):
+    """Raised when the bot already has the maximum number of pending jobs."""
+
+
+class JobQueue:
+    """
+    Bounded set of per-channel FIFO queues.
+
+    Jobs from the same channel run one after the other; jobs from different
+    channels run concurrently, limited only by the stage semaphores.
+    """
+
+    def __init__(self, max_pending=MAX_PENDING_JOBS):
+        self.max_pending = max_pending
+        self._queues = {}
+        self._workers = {}
+        self._running = set()
+        self._pending = 0
+
+    def submit(self, channel_id, job):
+        """
+        Queues a job for a channel.
+
+        Args:
+            channel_id (int): The Discord channel the job belongs to.
+            job (callable): A zero-argument coroutine function.
+
+        Returns:
+            int: The number of jobs ahead of this one in the channel.
+        """
+        if self._pending >= self.max_pending:
+            raise QueueFull(f"{self._pending} jobs already pending")
+
+        queue = self._queues.setdefault(channel_id, deque())
+        ahead = len(queue) + (1 if channel_id in self._running else 0)
+        queue.append(job)
+        self._pending += 1
+        if channel_id not in self._workers:
+            self._workers[channel_id] = asyncio.create_task(self._drain(channel_id))
+        return ahead
+
+    async def enqueue(self, channel, job):
+        """Submits a job for a Discord channel and tells the user where it landed."""
+        try:
+            ahead = self.submit(channel.id, job)
+        except QueueFull:
+            await channel.send('Too many requests in progress, please try again in a few minutes.')
+            return
+        if ahead:
+            await channel.send(f'Queued, position {ahead}.')
+
+    async def _drain(self, channel_id):
+        queue = self._queues[channel_id]
+        while queue:
+            job = queue.popleft()
+            self._running.add(channel_id)
+            try:
+                await job()
+            except Exception as e:
+                print(f"Error processing job in channel {channel_id}: {e}")
+            finally:
+                self._running.discard(channel_id)
+                self._pending -= 1
+        del self._queues[channel_id]
+        del self._workers[channel_id]
@@ -0,0 +1,170 @@
+"""
+In-process instrumentation shared by the bots.
+
+Pipeline stages are timed with span() into per-stage latency histograms, and
+totals such as model tokens and downloaded bytes are kept as counters. Set
+BOT_METRICS_LOG to also append every span and model call to a JSON lines file,
+and BOT_METRICS_PORT to serve the current counters and histograms as JSON on
+http://127.0.0.1:<port>/metrics.
+"""
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+METRICS_LOG = os.getenv('BOT_METRICS_LOG')
+METRICS_PORT = int(os.getenv('BOT_METRICS_PORT', '0'))
+# Upper bounds in seconds; the last bucket catches everything slower
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def series_name(name, labels):
+    """Formats a metric name and its labels as name{key=value,...}."""
+    if not labels:
+        return name
+    return name + '{' + ','.join(f"{key}={value}" for key, value in sorted(labels.items())) + '}'
+
+
+class Histogram:
+    """Bucketed distribution of observed values, with count, sum and max."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def to_dict(self):
+        bounds = [str(bound) for bound in self.buckets] + ['+Inf']
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'max': round(self.max, 6),
+            'buckets': dict(zip(bounds, self.counts)),
+        }
+
+
+class Metrics:
+    """
+    Thread-safe counters, histograms and an optional JSON lines event log.
+
+    Args:
+        log_path (str): File to append events to, or None to only aggregate.
+    """
+
+    def __init__(self, log_path=METRICS_LOG):
+        self.log_path = log_path
+        self.labels = {}
+        self.counters = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    def configure(self, **labels):
+        """Sets labels added to every logged event, e.g. bot='youtube-summarizer'."""
+        self.labels.update(labels)
+
+    def count(self, name, value=1, **labels):
+        key = series_name(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = series_name(name, labels)
+        with self._lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram()
+            self.histograms[key].observe(value)
+
+    @contextmanager
+    def span(self, stage, **labels):
+        """
+        Times a pipeline stage into the stage_seconds histogram.
+
+        Yields a dict; anything stored in it (byte or token counts, for
+        instance) is written to the event log along with the duration.
+        """
+        fields = {}
+        error = None
+        start = time.perf_counter()
+        try:
+            yield fields
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe('stage_seconds', elapsed, stage=stage)
+            if error:
+                self.count('stage_errors', stage=stage)
+            self.event('span', stage=stage, seconds=round(elapsed, 4), error=error, **labels, **fields)
+
+    def event(self, kind, **fields):
+        """Appends one JSON line to the event log, if one is configured."""
+        if not self.log_path:
+            return
+        record = json.dumps({'time': round(time.time(), 3), 'event': kind, **self.labels, **fields}, default=str)
+        with self._lock:
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(record + '\n')
+
+    def snapshot(self):
+        """Returns the current counters and histograms as a JSON-serializable dict."""
+        with self._lock:
+            return {
+                'labels': dict(self.labels),
+                'counters': dict(self.counters),
+                'histograms': {key: histogram.to_dict() for key, histogram in self.histograms.items()},
+            }
+
+    def serve(self, port=METRICS_PORT, host='127.0.0.1'):
+        """Serves snapshot() at /metrics from a background thread. Does nothing if port is 0."""
+        if not port or self._server is not None:
+            return
+        # Most runs never serve metrics, so the HTTP server is not imported with the bots
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip('/') != '/metrics':
+                    self.send_error(404)
+                    return
+                body = json.dumps(metrics.snapshot(), indent=2).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name='metrics-server', daemon=True).start()
+        print(f"Serving metrics on http://{host}:{port}/metrics")
+
+
+metrics = Metrics()
+
+
+def record_usage(model_name, usage_metadata):
+    """Adds the token counts of one Gemini response to the counters."""
+    metrics.count('llm_calls', model=model_name)
+    if usage_metadata is None:
+        return
+    input_tokens = getattr(usage_metadata, 'prompt_token_count', 0) or 0
+    output_tokens = getattr(usage_metadata, 'candidates_token_count', 0) or 0
+    metrics.count('llm_input_tokens', input_tokens, model=model_name)
+    metrics.count('llm_output_tokens', output_tokens, model=model_name)
+    metrics.event('llm', model=model_name, input_tokens=input_tokens, output_tokens=output_tokens)
@@ -0,0 +1,201 @@
+"""
+Shared Vertex AI model registry.
+
+vertexai.init() runs once per process and each GenerativeModel is built once
+and reused, so its underlying prediction client (and connection pool) is
+shared by every request instead of being rebuilt on each call.
+
+The Vertex AI SDK is only imported when the first model is built, so scripts
+that never reach a model call (or only reach it late) start faster.
+
+Run `python -m discord_agents.models <model>` to measure the per-call setup
+overhead the registry saves.
+"""
+import argparse
+import os
+import threading
+import time
+
+from discord_agents.metrics import metrics, record_usage
+
+VERTEX_PROJECT = os.getenv('VERTEX_IA_PROJECT')
+VERTEX_REGION = os.getenv('VERTEX_IA_REGION')
+
+# Shared by every bot; callers override single keys, e.g. a lower temperature
+DEFAULT_GENERATION_CONFIG = {
+    "max_output_tokens": 8192,
+    "temperature": 1,
+    "top_p": 0.95,
+}
+
+# Rough average for English and Portuguese text with Gemini's tokenizer
+CHARS_PER_TOKEN = 4
+
+_safety_settings = None
+
+
+def safety_settings():
+    """Returns the safety settings applied to models built with safety=True."""
+    global _safety_settings
+    if _safety_settings is None:
+        import vertexai.preview.generative_models as generative_models
+        threshold = generative_models.HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE
+        _safety_settings = {
+            generative_models.HarmCategory.HARM_CATEGORY_HATE_SPEECH: threshold,
+            generative_models.HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: threshold,
+            generative_models.HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: threshold,
+            generative_models.HarmCategory.HARM_CATEGORY_HARASSMENT: threshold,
+        }
+    return _safety_settings
+
+
+class ModelRegistry:
+    """
+    Creates Gemini models once per (model, generation config, safety) combination.
+    """
+
+    def __init__(self, project=VERTEX_PROJECT, location=VERTEX_REGION):
+        self.project = project
+        self.location = location
+        self._lock = threading.Lock()
+        self._initialized = False
+        self._models = {}
+        self.setup_seconds = 0.0
+        self.hits = 0
+
+    def get(self, model_name, generation_config=None, safety=False):
+        """
+        Returns a shared GenerativeModel.
+
+        Args:
+            model_name (str): The Gemini model name.
+            generation_config (dict): Generation config baked into the model.
+            safety (bool): Whether to apply safety_settings().
+        """
+        key = (model_name, tuple(sorted((generation_config or {}).items())), safety)
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                self.hits += 1
+                return model
+            start = time.perf_counter()
+            import vertexai
+            from vertexai.generative_models import GenerativeModel
+            if not self._initialized:
+                vertexai.init(project=self.project, location=self.location)
+                self._initialized = True
+            model = GenerativeModel(
+                model_name,
+                generation_config=generation_config,
+                safety_settings=safety_settings() if safety else None,
+            )
+            self.setup_seconds += time.perf_counter() - start
+            self._models[key] = model
+            return model
+
+    def warm_up(self, model_name, generation_config=None, safety=False):
+        """
+        Builds a model and opens its connection with a free count_tokens call.
+        """
+        model = self.get(model_name, generation_config, safety)
+        start = time.perf_counter()
+        try:
+            model.count_tokens("ping")
+        except Exception as e:
+            print(f"Error warming up {model_name}: {e}")
+            return model
+        elapsed = time.perf_counter() - start
+        self.setup_seconds += elapsed
+        print(f"Warmed up {model_name} in {elapsed:.2f}s")
+        return model
+
+
+def estimate_tokens(text):
+    """Estimates the token count of text without a count_tokens round trip."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def model_name(model):
+    """Returns the short name of a GenerativeModel, e.g. gemini-1.5-pro."""
+    return getattr(model, '_model_name', 'unknown').rsplit('/', 1)[-1]
+
+
+def generate(model, contents, on_chunk=None, on_usage=None):
+    """
+    Runs a generate_content call and returns the full text.
+
+    The call is timed as an 'llm' span and its token usage is recorded.
+
+    Args:
+        model (GenerativeModel): The model to call.
+        contents (list): Prompt parts.
+        on_chunk (callable): If given, the response is streamed and each piece
+            of text is passed to it as soon as it arrives.
+        on_usage (callable): If given, receives the response's usage metadata.
+    """
+    name = model_name(model)
+    with metrics.span('llm', model=name, stream=on_chunk is not None):
+        if on_chunk is None:
+            response = model.generate_content(contents, stream=False)
+            record_usage(name, response.usage_metadata)
+            if on_usage:
+                on_usage(response.usage_metadata)
+            return response.text
+
+        text = ""
+        usage_metadata = None
+        start = time.perf_counter()
+        for response in model.generate_content(contents, stream=True):
+            if not text:
+                metrics.observe('llm_first_chunk_seconds', time.perf_counter() - start, model=name)
+            text += response.text
+            # Only the last streamed response carries the usage totals
+            usage_metadata = response.usage_metadata or usage_metadata
+            on_chunk(response.text)
+        record_usage(name, usage_metadata)
+        if on_usage:
+            on_usage(usage_metadata)
+        return text
+
+
+def measure_setup_overhead(project, location, model_name, runs=5):
+    """
+    Compares a cold init-and-call per request against reusing a registry model.
+
+    Returns:
+        tuple: Average seconds per call (cold, reused).
+    """
+    import vertexai
+    from vertexai.generative_models import GenerativeModel
+
+    cold = 0.0
+    for _ in range(runs):
+        start = time.perf_counter()
+        vertexai.init(project=project, location=location)
+        GenerativeModel(model_name).count_tokens("ping")
+        cold += time.perf_counter() - start
+
+    registry = ModelRegistry(project, location)
+    registry.warm_up(model_name)
+    reused = 0.0
+    for _ in range(runs):
+        start = time.perf_counter()
+        registry.get(model_name).count_tokens("ping")
+        reused += time.perf_counter() - start
+    return cold / runs, reused / runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure Vertex AI per-call setup overhead.')
+    parser.add_argument('model', nargs='?', default='gemini-1.5-flash-001', help='Model name')
+    parser.add_argument('--runs', '-n', type=int, default=5, help='Calls per mode')
+    args = parser.parse_args()
+
+    cold, reused = measure_setup_overhead(VERTEX_PROJECT, VERTEX_REGION, args.model, args.runs)
+    print(f"cold init per call: {cold * 1000:.1f} ms")
+    print(f"shared registry:    {reused * 1000:.1f} ms")
+    print(f"saved per call:     {(cold - reused) * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
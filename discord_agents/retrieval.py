@@ -0,0 +1,66 @@
+"""
+Local lexical retrieval over transcript passages.
+
+A small BM25 index lets follow-up questions send only the most relevant
+timestamped passages to the model instead of the whole transcript.
+"""
+import math
+import re
+from collections import Counter
+
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'but', 'by', 'did', 'do', 'does', 'for', 'from', 'had', 'has',
+    'have', 'he', 'her', 'his', 'how', 'i', 'if', 'in', 'is', 'it', 'its', 'me', 'my', 'of', 'on', 'or', 'our',
+    'she', 'so', 'that', 'the', 'their', 'them', 'they', 'this', 'to', 'um', 'uh', 'was', 'we', 'were', 'what',
+    'when', 'where', 'which', 'who', 'why', 'will', 'with', 'you', 'your',
+}
+
+_word_pattern = re.compile(r"\w+")
+
+
+def tokenize(text):
+    return [word for word in _word_pattern.findall(text.lower()) if word not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Okapi BM25 ranking over a fixed list of passages.
+
+    Args:
+        passages (list): (start, end, text) tuples, as returned by chunk_transcript().
+    """
+
+    def __init__(self, passages, k1=1.5, b=0.75):
+        self.passages = passages
+        self.k1 = k1
+        self.b = b
+        self._term_counts = [Counter(tokenize(text)) for _, _, text in passages]
+        self._lengths = [sum(counts.values()) for counts in self._term_counts]
+        self._average_length = (sum(self._lengths) / len(self._lengths)) if passages else 0
+        document_frequency = Counter()
+        for counts in self._term_counts:
+            document_frequency.update(counts.keys())
+        total = len(passages)
+        self._idf = {
+            term: math.log(1 + (total - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in document_frequency.items()
+        }
+
+    def score(self, query_terms, i):
+        counts = self._term_counts[i]
+        norm = self.k1 * (1 - self.b + self.b * self._lengths[i] / (self._average_length or 1))
+        score = 0.0
+        for term in query_terms:
+            frequency = counts.get(term)
+            if frequency:
+                score += self._idf[term] * frequency * (self.k1 + 1) / (frequency + norm)
+        return score
+
+    def search(self, query, k=5):
+        """
+        Returns the k best matching passages for query, in transcript order.
+        """
+        query_terms = set(tokenize(query))
+        scored = [(self.score(query_terms, i), i) for i in range(len(self.passages))]
+        best = sorted((item for item in scored if item[0] > 0), reverse=True)[:k]
+        return [self.passages[i] for _, i in sorted(best, key=lambda item: item[1])]
@@ -0,0 +1,342 @@
+"""
+Quota-aware scheduling of Gemini calls.
+
+Every model call of a bot goes through one Scheduler, which keeps a budget per
+model: requests and input tokens per minute (token buckets refilled
+continuously, like the Vertex AI quotas) and a cap on calls in flight. Calls
+waiting for budget are served by priority, so interactive /ask answers go
+ahead of the chunk and segment calls of bulk summaries.
+
+A 429/ResourceExhausted (or another transient error) is retried with jittered
+exponential backoff, and pauses the model's budget so the other waiting calls
+back off too. When a light model is given, short inputs and calls made while
+the main model is slow or backing off are routed to it, and a call that gets
+no response within the timeout is retried once on it.
+
+Quotas are set with VERTEX_QUOTAS as comma separated
+<model>=<requests per minute>:<input tokens per minute> entries, e.g.
+VERTEX_QUOTAS=gemini-1.5-pro=60:4000000,gemini-1.5-flash-001=200:4000000
+"""
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+
+from discord_agents.metrics import metrics
+from discord_agents.models import estimate_tokens, generate
+
+# Lower runs first
+INTERACTIVE = 0
+BULK = 1
+
+DEFAULT_QUOTAS = {
+    'gemini-1.5-pro': (60, 4_000_000),
+    'gemini-1.5-flash-001': (200, 4_000_000),
+}
+# Used for models missing from DEFAULT_QUOTAS and VERTEX_QUOTAS
+FALLBACK_QUOTA = (60, 1_000_000)
+MAX_CONCURRENT_CALLS = int(os.getenv('VERTEX_MAX_CONCURRENT_CALLS', '6'))
+MAX_RETRIES = int(os.getenv('VERTEX_MAX_RETRIES', '5'))
+BACKOFF_BASE = float(os.getenv('VERTEX_BACKOFF_BASE_SECONDS', '1'))
+BACKOFF_MAX = float(os.getenv('VERTEX_BACKOFF_MAX_SECONDS', '60'))
+# Inputs up to this many tokens go to the light model when one is given
+LIGHT_MODEL_MAX_TOKENS = int(os.getenv('VERTEX_LIGHT_MODEL_MAX_TOKENS', '8000'))
+# Recent call latency above which the main model counts as under pressure
+PRESSURE_LATENCY = float(os.getenv('VERTEX_PRESSURE_LATENCY_SECONDS', '60'))
+# Seconds without a response (the first chunk, when streaming) before falling back to the light model
+CALL_TIMEOUT = float(os.getenv('VERTEX_CALL_TIMEOUT_SECONDS', '120'))
+
+# HTTP statuses of google.api_core errors worth retrying
+RETRYABLE_CODES = {429, 500, 503, 504}
+RETRYABLE_ERRORS = {
+    'ResourceExhausted', 'TooManyRequests', 'ServiceUnavailable', 'InternalServerError', 'DeadlineExceeded',
+    # Socket and transport timeouts
+    'TimeoutError',
+}
+
+
+class CallTimeout(Exception):
+    """Raised when a call gets no response within the scheduler's own timeout."""
+
+
+def parse_quotas(value):
+    """Parses VERTEX_QUOTAS into {model: (requests per minute, tokens per minute)}."""
+    quotas = {}
+    for entry in filter(None, (entry.strip() for entry in (value or '').split(','))):
+        try:
+            name, limits = entry.rsplit('=', 1)
+            requests, tokens = limits.split(':')
+            quotas[name.strip()] = (float(requests), float(tokens))
+        except ValueError:
+            print(f"Ignoring invalid VERTEX_QUOTAS entry: {entry}")
+    return quotas
+
+
+QUOTAS = {**DEFAULT_QUOTAS, **parse_quotas(os.getenv('VERTEX_QUOTAS'))}
+
+
+def is_retryable(error):
+    """Tells whether an SDK error is a rate limit or a transient server error."""
+    code = getattr(error, 'code', None)
+    return type(error).__name__ in RETRYABLE_ERRORS or (isinstance(code, int) and code in RETRYABLE_CODES)
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_MAX):
+    """Full-jitter exponential backoff: a random delay up to base * 2^attempt, capped."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class TokenBucket:
+    """
+    A budget refilled continuously at `per_minute`, holding at most one minute's worth.
+
+    The level can go below zero when a call turns out to use more than was
+    reserved; later calls then wait for the debt to be refilled.
+    """
+
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """Seconds until `amount` is available. Amounts above the capacity wait for a full bucket."""
+        self._refill()
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate) if self.rate else 0.0
+
+    def take(self, amount):
+        self._refill()
+        self.level -= amount
+
+
+class ModelBudget:
+    """
+    Requests per minute, input tokens per minute and calls in flight for one model.
+
+    Not thread-safe on its own; the Scheduler holds its condition while using it.
+    """
+
+    def __init__(self, name, requests_per_minute, tokens_per_minute, max_concurrent=MAX_CONCURRENT_CALLS):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_concurrent = max_concurrent
+        self.active = 0
+        self.paused_until = 0.0
+        # Exponential moving average of call latency, in seconds
+        self.latency = 0.0
+        self.waiting = []
+
+    def wait_time(self, tokens):
+        """Seconds until a call of `tokens` input tokens can start, or None if all slots are busy."""
+        if self.active >= self.max_concurrent:
+            return None
+        return max(self.requests.wait_time(1), self.tokens.wait_time(tokens), self.paused_until - time.monotonic())
+
+    def under_pressure(self):
+        """Tells whether calls to this model are backing off, queueing or slow right now."""
+        return (
+            self.paused_until > time.monotonic()
+            or len(self.waiting) >= self.max_concurrent
+            or self.latency > PRESSURE_LATENCY
+        )
+
+
+class Scheduler:
+    """
+    Runs generate() calls for the models of a ModelRegistry within their quotas.
+
+    Args:
+        registry (ModelRegistry): Where models are built and shared.
+        quotas (dict): {model: (requests per minute, input tokens per minute)}.
+    """
+
+    def __init__(self, registry, quotas=QUOTAS, max_concurrent=MAX_CONCURRENT_CALLS):
+        self.registry = registry
+        self.quotas = quotas
+        self.max_concurrent = max_concurrent
+        self._condition = threading.Condition()
+        self._budgets = {}
+        self._tickets = itertools.count()
+
+    def budget(self, name):
+        with self._condition:
+            if name not in self._budgets:
+                requests, tokens = self.quotas.get(name, FALLBACK_QUOTA)
+                self._budgets[name] = ModelBudget(name, requests, tokens, self.max_concurrent)
+            return self._budgets[name]
+
+    def route(self, model_name, light_model, input_tokens):
+        """Picks the model for a call: the light one for short inputs or when the main one is under pressure."""
+        if not light_model or light_model == model_name:
+            return model_name
+        if input_tokens <= LIGHT_MODEL_MAX_TOKENS:
+            return light_model
+        with self._condition:
+            under_pressure = self.budget(model_name).under_pressure()
+        if under_pressure:
+            metrics.count('llm_routed_under_pressure', model=model_name)
+            return light_model
+        return model_name
+
+    def _acquire(self, budget, tokens, priority):
+        ticket = (priority, next(self._tickets))
+        queued = time.perf_counter()
+        with self._condition:
+            heapq.heappush(budget.waiting, ticket)
+            try:
+                while True:
+                    wait = budget.wait_time(tokens) if budget.waiting[0] == ticket else None
+                    if wait is not None and wait <= 0:
+                        budget.requests.take(1)
+                        budget.tokens.take(tokens)
+                        budget.active += 1
+                        break
+                    self._condition.wait(wait)
+            finally:
+                budget.waiting.remove(ticket)
+                heapq.heapify(budget.waiting)
+                self._condition.notify_all()
+        label = 'interactive' if priority == INTERACTIVE else 'bulk'
+        metrics.observe('llm_queue_seconds', time.perf_counter() - queued, model=budget.name, priority=label)
+
+    def _release(self, budget, reserved, used, seconds=None, pause=0.0):
+        with self._condition:
+            budget.active -= 1
+            if used is not None:
+                # Settle the reservation with the billed input tokens
+                budget.tokens.take(used - reserved)
+            if seconds is not None:
+                budget.latency = seconds if not budget.latency else 0.8 * budget.latency + 0.2 * seconds
+            if pause:
+                budget.paused_until = max(budget.paused_until, time.monotonic() + pause)
+            self._condition.notify_all()
+
+    def generate(self, model_name, contents, on_chunk=None, generation_config=None, safety=False,
+                 priority=BULK, light_model=None, timeout=CALL_TIMEOUT, on_fallback=None):
+        """
+        Runs a generate() call within the model's budget and returns the text.
+
+        Args:
+            model_name (str): The model to use for long inputs.
+            contents (list): Prompt parts.
+            on_chunk (callable): Streams the response to it, as in generate().
+            generation_config (dict): Generation config of the model.
+            safety (bool): Whether to apply the shared safety settings.
+            priority (int): INTERACTIVE or BULK.
+            light_model (str): Cheaper, faster model for short inputs, for
+                calls made under pressure and as the fallback on timeout.
+            timeout (float): Seconds to wait for a response before falling
+                back to the light model. Only applies when there is one.
+            on_fallback (callable): Called with the light model's name when the
+                call goes to it because the main model was under pressure or
+                timed out rather than because the input was short, e.g. so
+                results that depend on the load are not cached.
+        """
+        # Audio and other non-text parts are settled from the billed usage afterwards
+        input_tokens = sum(estimate_tokens(item) for item in contents if isinstance(item, str))
+        name = self.route(model_name, light_model, input_tokens)
+        if name != model_name and input_tokens > LIGHT_MODEL_MAX_TOKENS and on_fallback:
+            on_fallback(name)
+        fallback = light_model if light_model and light_model != name else None
+        try:
+            return self._call(name, contents, on_chunk, generation_config, safety, priority, input_tokens,
+                              timeout if fallback else None)
+        except CallTimeout:
+            # Only raised when there is a fallback, since the timeout is not applied otherwise
+            metrics.count('llm_fallbacks', model=name, fallback=fallback)
+            print(f"{name} did not respond within {timeout:g}s, falling back to {fallback}")
+            if on_fallback:
+                on_fallback(fallback)
+            return self._call(fallback, contents, on_chunk, generation_config, safety, priority, input_tokens, None)
+
+    def _call(self, name, contents, on_chunk, generation_config, safety, priority, input_tokens, timeout):
+        model = self.registry.get(name, generation_config, safety)
+        budget = self.budget(name)
+        attempt = 0
+        while True:
+            self._acquire(budget, input_tokens, priority)
+            usage = []
+            chunks = []
+            forward = (lambda text: (chunks.append(text), on_chunk(text))) if on_chunk else None
+            start = time.perf_counter()
+            settle = lambda: self._release(budget, input_tokens, self._billed(usage), time.perf_counter() - start)
+            try:
+                if timeout is None:
+                    text = generate(model, contents, forward, usage.append)
+                else:
+                    text = self._generate_with_timeout(model, contents, forward, usage.append, timeout, settle)
+            except CallTimeout:
+                # The abandoned call still runs on Vertex and keeps its slot until it ends
+                raise
+            except Exception as e:
+                # A retry would repeat text that was already streamed to the user
+                if not is_retryable(e) or chunks or attempt >= MAX_RETRIES:
+                    self._release(budget, input_tokens, None)
+                    raise
+                delay = backoff_delay(attempt)
+                self._release(budget, input_tokens, None, pause=delay)
+                metrics.count('llm_retries', model=name, error=type(e).__name__)
+                print(f"{name} returned {type(e).__name__}, retrying in {delay:.1f}s")
+                attempt += 1
+                continue
+            settle()
+            return text
+
+    @staticmethod
+    def _billed(usage):
+        return getattr(usage[0], 'prompt_token_count', None) if usage and usage[0] else None
+
+    def _generate_with_timeout(self, model, contents, on_chunk, on_usage, timeout, on_abandoned_done):
+        """
+        Runs generate() on a helper thread and raises CallTimeout if no response
+        (or first chunk) arrives within timeout. The SDK call cannot be cancelled,
+        so a timed out call is left to finish and its output is dropped. The
+        helper thread calls on_abandoned_done() once it does, so the caller can
+        keep the call's budget slot until then.
+        """
+        responded = threading.Event()
+        abandoned = threading.Event()
+        lock = threading.Lock()
+        outcome = {}
+
+        def forward(text):
+            # Checked and set together, so a chunk racing the deadline is either streamed or dropped
+            with lock:
+                if abandoned.is_set():
+                    return
+                responded.set()
+            on_chunk(text)
+
+        def run():
+            try:
+                outcome['text'] = generate(model, contents, forward if on_chunk else None, on_usage)
+            except Exception as e:
+                outcome['error'] = e
+            with lock:
+                responded.set()
+            if abandoned.is_set():
+                on_abandoned_done()
+
+        worker = threading.Thread(target=run, name='llm-call', daemon=True)
+        worker.start()
+        if not responded.wait(timeout):
+            with lock:
+                # The call may have responded right at the deadline
+                if not responded.is_set():
+                    abandoned.set()
+            if abandoned.is_set():
+                raise CallTimeout(f"no response within {timeout}s")
+        worker.join()
+        if 'error' in outcome:
+            raise outcome['error']
+        return outcome['text']
@@ -0,0 +1,179 @@
+"""
+Podcast page scraping.
+
+Most episode pages carry everything we need in their server-rendered HTML, so
+a plain HTTP fetch is tried first. Only pages that need JavaScript fall back to
+a long-lived Chromium instance whose browser contexts are reused between
+requests instead of launching a new browser for every link.
+"""
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+import requests
+
+from discord_agents.metrics import metrics
+
+BROWSER_CONTEXTS = int(os.getenv('PODCAST_BROWSER_CONTEXTS', '2'))
+HTTP_TIMEOUT = float(os.getenv('PODCAST_HTTP_TIMEOUT', '15'))
+USER_AGENT = 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36'
+
+# Reads every field in a single round trip to the page
+EXTRACT_SCRIPT = """() => {
+    const title = document.querySelector('meta[property="og:title"]');
+    const link = document.querySelector('a.download-button');
+    const date = document.querySelector('#episode_date');
+    return {
+        og_title: title ? title.content : null,
+        download_url: link ? link.href : null,
+        release_date: date ? date.textContent : null,
+    };
+}"""
+
+VOID_ELEMENTS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'}
+
+http_session = requests.Session()
+http_session.headers['User-Agent'] = USER_AGENT
+
+
+def podcast_result(og_title, download_url, release_date):
+    """
+    Builds the podcast info dict from the raw page fields.
+
+    Returns:
+        dict: podcast_title, episode_title, download_url and release_date, or
+        None if a field is missing.
+    """
+    if not og_title or not download_url or release_date is None or ' - ' not in og_title:
+        return None
+    return {
+        'podcast_title': og_title.split(' - ')[1].strip(),
+        'episode_title': og_title.split(' - ')[0].strip(),
+        'download_url': download_url,
+        'release_date': release_date.strip(),
+    }
+
+
+class PodcastPageParser(HTMLParser):
+    """Collects og:title, the a.download-button href and the #episode_date text."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.og_title = None
+        self.download_url = None
+        self.release_date = None
+        self._date_depth = 0
+        self._date_parts = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'meta' and attrs.get('property') == 'og:title' and self.og_title is None:
+            self.og_title = attrs.get('content')
+        elif tag == 'a' and self.download_url is None and 'download-button' in (attrs.get('class') or '').split():
+            self.download_url = attrs.get('href')
+
+        if tag in VOID_ELEMENTS:
+            return
+        if self._date_depth:
+            self._date_depth += 1
+        elif attrs.get('id') == 'episode_date' and self.release_date is None:
+            self._date_depth = 1
+
+    def handle_endtag(self, tag):
+        if self._date_depth and tag not in VOID_ELEMENTS:
+            self._date_depth -= 1
+            if not self._date_depth:
+                self.release_date = ''.join(self._date_parts)
+
+    def handle_data(self, data):
+        if self._date_depth:
+            self._date_parts.append(data)
+
+
+def parse_podcast_html(html, base_url):
+    parser = PodcastPageParser()
+    parser.feed(html)
+    parser.close()
+    download_url = urljoin(base_url, parser.download_url) if parser.download_url else None
+    return podcast_result(parser.og_title, download_url, parser.release_date)
+
+
+def fetch_podcast_info_http(url):
+    """Tries to extract the podcast info from the raw HTML, without a browser."""
+    try:
+        response = http_session.get(url, timeout=HTTP_TIMEOUT)
+        response.raise_for_status()
+        metrics.count('scrape_http_bytes', len(response.content))
+        return parse_podcast_html(response.text, response.url)
+    except requests.RequestException as e:
+        print(f"Error fetching podcast page {url}: {e}")
+        return None
+
+
+class BrowserPool:
+    """
+    A single long-lived Chromium with a fixed pool of reusable browser contexts.
+
+    The browser is launched on first use and relaunched if it disconnects.
+    """
+
+    def __init__(self, size=BROWSER_CONTEXTS):
+        self.size = size
+        self._playwright = None
+        self._browser = None
+        self._contexts = None
+        self._lock = asyncio.Lock()
+
+    async def _ensure_started(self):
+        async with self._lock:
+            if self._browser is not None and self._browser.is_connected():
+                return
+            await self.close()
+            # Imported here so the HTTP fast path never pays for loading Playwright
+            from playwright.async_api import async_playwright
+            self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.launch()
+            self._contexts = asyncio.Queue()
+            for _ in range(self.size):
+                self._contexts.put_nowait(await self._browser.new_context(user_agent=USER_AGENT))
+
+    @asynccontextmanager
+    async def page(self):
+        """Yields a fresh page from one of the pooled contexts."""
+        await self._ensure_started()
+        contexts = self._contexts
+        context = await contexts.get()
+        page = await context.new_page()
+        try:
+            yield page
+        finally:
+            try:
+                await page.close()
+            except Exception as e:
+                print(f"Error closing page: {e}")
+            contexts.put_nowait(context)
+
+    async def close(self):
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception as e:
+                print(f"Error closing browser: {e}")
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+
+browser_pool = BrowserPool()
+
+
+async def fetch_podcast_info_browser(url):
+    """Extracts the podcast info from a rendered page using the browser pool."""
+    with metrics.span('scrape_browser'):
+        async with browser_pool.page() as page:
+            await page.goto(url)
+            fields = await page.evaluate(EXTRACT_SCRIPT)
+    return podcast_result(fields['og_title'], fields['download_url'], fields['release_date'])
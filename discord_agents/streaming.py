@@ -0,0 +1,106 @@
+"""
+Progressive delivery of model output to Discord.
+
+Instead of waiting for the whole response, the first tokens are posted as soon
+as they arrive and the message is then edited in place at a throttled rate.
+When the text outgrows one Discord message it is packed with pack_message() and
+the rest continues in new messages. With BOT_USE_EMBEDS the text is streamed
+into embed descriptions packed by pack_embeds() instead, so a long reply needs
+fewer messages and edits.
+"""
+import asyncio
+import os
+import time
+
+from discord_agents.formatting import USE_EMBEDS, pack_embeds, pack_message
+from discord_agents.metrics import metrics
+
+STREAM_RESPONSES = os.getenv('BOT_STREAM_RESPONSES', 'true').lower() in ('1', 'true', 'yes')
+# Discord allows roughly five edits per five seconds per channel
+STREAM_EDIT_INTERVAL = float(os.getenv('BOT_STREAM_EDIT_INTERVAL', '1.5'))
+
+
+class MessageStreamer:
+    """
+    Streams growing text into a Discord channel.
+
+    Use it as an async context manager and pass feed() as the on_chunk
+    callback of a generate_* function running on the worker pool:
+
+        async with MessageStreamer(channel) as streamer:
+            await run_blocking('llm', generate_summary, transcript, streamer.feed)
+    """
+
+    def __init__(self, channel, prefix='', interval=STREAM_EDIT_INTERVAL, embeds=USE_EMBEDS):
+        self.channel = channel
+        self.text = prefix
+        self.interval = interval
+        self.embeds = embeds
+        self._messages = []
+        self._done = False
+        self._changed = asyncio.Event()
+        self._loop = None
+        self._task = None
+        self._started = None
+
+    async def __aenter__(self):
+        self._started = time.perf_counter()
+        self._loop = asyncio.get_running_loop()
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def feed(self, chunk):
+        """Appends generated text. Safe to call from worker threads."""
+        self._loop.call_soon_threadsafe(self._append, chunk)
+
+    async def close(self):
+        """Sends whatever is left and stops streaming."""
+        if self._done:
+            return
+        self._done = True
+        self._changed.set()
+        await self._task
+        metrics.observe('stream_seconds', time.perf_counter() - self._started)
+        metrics.count('discord_messages', len(self._messages))
+
+    def _append(self, chunk):
+        self.text += chunk
+        self._changed.set()
+
+    async def _run(self):
+        while True:
+            await self._changed.wait()
+            self._changed.clear()
+            await self._flush()
+            if self._done:
+                return
+            await asyncio.sleep(self.interval)
+
+    def _payload(self, page):
+        if not self.embeds:
+            return {'content': page}
+        import discord
+        return {'embeds': [discord.Embed(description=description) for description in page]}
+
+    async def _flush(self):
+        # A page is a message's text, or the list of its embed descriptions
+        pages = pack_embeds(self.text) if self.embeds else pack_message(self.text)
+        for i, page in enumerate(pages):
+            if i < len(self._messages):
+                message, content = self._messages[i]
+                if content != page:
+                    await message.edit(**self._payload(page))
+                    self._messages[i] = (message, page)
+                    metrics.count('discord_edits')
+            else:
+                if not self._messages:
+                    # Time until the user sees the first words of the reply
+                    metrics.observe('stream_first_message_seconds', time.perf_counter() - self._started)
+                self._messages.append((await self.channel.send(**self._payload(page)), page))
+        # Repacking can occasionally need one message fewer than before
+        for message, _ in self._messages[len(pages):]:
+            await message.delete()
+        del self._messages[len(pages):]
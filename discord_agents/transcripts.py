@@ -0,0 +1,140 @@
+"""
+Transcript preprocessing before transcripts are sent to the model.
+
+Auto-generated YouTube captions repeat the end of the previous line at the
+start of the next one, and are full of [Music] style markers, filler words and
+stutters. All of it is billed as input tokens on every summary and /ask call.
+clean_entries() removes that noise while keeping each entry's timing, and
+transcript_text() renders the result with a short timestamp marker once per
+interval instead of none or one per line.
+
+Filler words and stutters depend on the caption language: "um" is a filler in
+English but the article "a" in Portuguese, and "had had" is correct English.
+Languages without an entry below only get the language-neutral cleaning.
+"""
+import html
+import re
+
+# How many words at the start of a caption line can repeat the end of the previous one
+MAX_OVERLAP_WORDS = 20
+MIN_OVERLAP_WORDS = 2
+
+_noise = re.compile(
+    r'\[[^\]]{0,40}\]'
+    r'|\((?:music|applause|laughter|laughs|inaudible|silence|cheering|crosstalk)\)'
+    r'|[♪♫]+',
+    re.IGNORECASE,
+)
+# Filler words per caption language
+FILLERS = {
+    'en': r'um+|uh+|uhm|erm|hmm+|mhm',
+    'pt': r'hã+|ãh+|hum+|ahn+',
+}
+# Short words a speaker repeats by mistake. Any other word only counts as a
+# stutter when it is said three or more times in a row.
+STUTTER_WORDS = {
+    'en': {'i', 'a', 'an', 'the', 'and', 'to', 'so', 'we', 'you', 'it', 'but', 'of', 'in', 'on', 'my'},
+    'pt': {'o', 'a', 'os', 'as', 'e', 'de', 'eu', 'um', 'uma', 'no', 'na', 'em', 'se'},
+}
+MIN_STUTTER_REPEATS = 3
+
+_fillers = {
+    language: re.compile(rf'\b(?:{words})\b[,.]?', re.IGNORECASE) for language, words in FILLERS.items()
+}
+_stutter = re.compile(r'\b(\w+)(?:\s+\1\b)+', re.IGNORECASE)
+_spaces = re.compile(r'\s+')
+_space_before_punctuation = re.compile(r'\s+([,.?!])')
+
+
+def compact_offset(seconds):
+    """Formats an offset as M:SS, or H:MM:SS past the first hour."""
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours:d}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes:d}:{seconds:02d}"
+
+
+def _base_language(language):
+    """Reduces a caption language code such as pt-BR to pt."""
+    return (language or '').split('-')[0].lower()
+
+
+def clean_text(text, language='en'):
+    """Removes markers, filler words and stutters from one caption line."""
+    language = _base_language(language)
+    stutter_words = STUTTER_WORDS.get(language, set())
+
+    def collapse(match):
+        repeats = len(match.group(0).split())
+        if repeats >= MIN_STUTTER_REPEATS or match.group(1).lower() in stutter_words:
+            return match.group(1)
+        return match.group(0)
+
+    # Captions are sometimes escaped twice, e.g. &amp;#39;
+    text = html.unescape(html.unescape(text))
+    text = _noise.sub(' ', text)
+    if language in _fillers:
+        text = _fillers[language].sub(' ', text)
+    text = _stutter.sub(collapse, text)
+    text = _spaces.sub(' ', text)
+    return _space_before_punctuation.sub(r'\1', text).strip(' ,')
+
+
+def _strip_overlap(previous_words, words):
+    """
+    Drops the leading words of a line that repeat the end of the previous line.
+
+    Only the immediately preceding line counts, so a phrase said again later,
+    like a second "thank you", is kept.
+    """
+    lowered = [word.lower() for word in words]
+    recent = [word.lower() for word in previous_words]
+    longest = min(len(previous_words), len(words), MAX_OVERLAP_WORDS)
+    for size in range(longest, MIN_OVERLAP_WORDS - 1, -1):
+        if recent[-size:] == lowered[:size]:
+            return words[size:]
+    return words
+
+
+def clean_entries(entries, language='en'):
+    """
+    Returns a cleaned copy of youtube_transcript_api entries.
+
+    Entries that are empty after cleaning, or only repeat the end of the
+    previous line, are dropped; the others keep their start and duration.
+
+    Args:
+        entries (list): Transcript entries.
+        language (str): Caption language code, e.g. 'en' or 'pt-BR'.
+    """
+    cleaned = []
+    previous_words = []
+    for entry in entries:
+        line_words = clean_text(entry['text'], language).split()
+        words = _strip_overlap(previous_words, line_words)
+        if line_words:
+            previous_words = line_words
+        if not words:
+            continue
+        cleaned.append({'text': ' '.join(words), 'start': entry['start'], 'duration': entry.get('duration', 0)})
+    return cleaned
+
+
+def transcript_text(entries, timestamp_interval=60):
+    """
+    Joins transcript entries into one text.
+
+    Args:
+        entries (list): Transcript entries, cleaned or not.
+        timestamp_interval (float): Seconds between [M:SS] markers, or 0 for
+            no markers.
+    """
+    parts = []
+    next_marker = 0
+    for entry in entries:
+        if timestamp_interval and entry['start'] >= next_marker:
+            parts.append(f"[{compact_offset(entry['start'])}]")
+            next_marker = (entry['start'] // timestamp_interval + 1) * timestamp_interval
+        parts.append(entry['text'])
+    return ' '.join(parts)
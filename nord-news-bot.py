@@ -1,17 +1,23 @@
 import argparse
 import sys
 import requests
+from requests.adapters import HTTPAdapter
 import base64
 import email
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
 from email.header import decode_header
-import vertexai
-from vertexai.generative_models import GenerativeModel
-
-import vertexai.preview.generative_models as generative_models
 import logging
 import os
+import queue
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from discord_agents.cache import DiskCache, SummaryCache, content_key
+from discord_agents.emails import extract_text, first_text_part
+from discord_agents.metrics import metrics
+from discord_agents.models import DEFAULT_GENERATION_CONFIG, ModelRegistry, estimate_tokens
+from discord_agents.scheduler import Scheduler
+from discord_agents.formatting import pack_message
 
 logger = logging.getLogger(__name__)
 
@@ -19,6 +25,19 @@ SCOPES = ['https://www.googleapis.com/auth/gmail.modify']
 CLIENT_SECRET_FILE = os.getenv("CLIENT_SECRET_FILE")
 VERTEX_IA_CREDENTIALS_PATH = os.getenv("VERTEX_IA_CREDENTIALS_PATH")
 NORD_NEWS_EMAIL = os.getenv("NORD_NEWS_EMAIL")
+CACHE_PATH = os.getenv("NORD_CACHE_PATH", "cache/nord.sqlite3")
+CACHE_TTL = float(os.getenv("NORD_CACHE_TTL_HOURS", "168")) * 3600
+CACHE_MAX_MB = float(os.getenv("NORD_CACHE_MAX_MB", "64"))
+ANALYSIS_CONCURRENCY = int(os.getenv("NORD_ANALYSIS_CONCURRENCY", "4"))
+# Gmail recommends at most 50 calls per batch request to avoid rate limiting
+GMAIL_BATCH_SIZE = 50
+POLL_INTERVAL = float(os.getenv("NORD_POLL_INTERVAL", "15"))
+# Polls a failing message is retried in daemon mode before it is left unread for good
+MAX_ATTEMPTS = int(os.getenv("NORD_MAX_ATTEMPTS", "5"))
+# How long a message given up on is remembered; Gmail keeps mailbox history for about a week
+GIVE_UP_TTL = float(os.getenv("NORD_GIVE_UP_TTL_HOURS", "168")) * 3600
+MODEL_NAME = "gemini-1.5-flash-001"
+GENERATION_CONFIG = DEFAULT_GENERATION_CONFIG
 
 PROMPT = """
 # INSTRUÇÕES PARA ANALISE:
@@ -40,57 +59,124 @@ Análise: Apresente resumo com no maximo 30 palavras, incluindo possíveis impac
 class DiscordWebhook:
     """
     A class for sending messages to a Discord webhook using environment variables.
+
+    Messages are split to fit Discord's 2000 character limit and delivered in
+    order by a background thread over a persistent connection. Rate limits are
+    honoured using the Retry-After and X-RateLimit-* headers, and failed
+    requests are retried with exponential backoff.
     """
 
-    def __init__(self):
+    def __init__(self, max_retries=5, timeout=30):
         """
         Initializes the DiscordWebhook object, fetching the webhook URL from the environment variable.
+
+        Args:
+            max_retries (int): Attempts per message after the first one fails.
+            timeout (float): Seconds to wait for Discord to answer a request.
         """
         # self.webhook_url = os.getenv("DISCORD_WEBHOOK_URL")
         self.webhook_url = "https://discord.com/api/webhooks/1256953966512701503/mPnvPxSfPeD28zYbiNp2PWNyFtCymOdhj9oyiWf83sh0YufKJDfBApFvVsmt0iQ2P06m"
         if not self.webhook_url:
             raise ValueError("DISCORD_WEBHOOK_URL environment variable not set.")
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        self._blocked_until = 0.0
 
     def send_message(self, message):
         """
-        Sends a message to the Discord webhook.
+        Queues a message for the Discord webhook.
 
         Args:
             message (str): The message to send.
+
+        Returns:
+            Future: Resolves to True once every part of the message has been
+            delivered, or False as soon as one part is given up on.
         """
+        delivered = Future()
+        self._queue.put((pack_message(message), delivered))
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="discord-webhook", daemon=True)
+                self._worker.start()
+        return delivered
 
-        try:
-            response = requests.post(self.webhook_url, json={"content": message})
+    def flush(self):
+        """Blocks until every queued message has been delivered or given up on."""
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            chunks, delivered = self._queue.get()
+            sent = False
+            try:
+                # The remaining parts of a message are not posted once one part failed
+                sent = all(self._post(content) for content in chunks)
+            except Exception as e:
+                print(f"Error: {e}")
+            finally:
+                delivered.set_result(sent)
+                self._queue.task_done()
+
+    def _post(self, content):
+        with metrics.span('webhook') as fields:
+            fields['sent'] = self._deliver(content, fields)
+            return fields['sent']
+
+    def _deliver(self, content, fields):
+        for attempt in range(self.max_retries + 1):
+            fields['attempts'] = attempt + 1
+            delay = self._blocked_until - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
 
-            if response.status_code == 204:
+            try:
+                response = self.session.post(self.webhook_url, json={"content": content}, timeout=self.timeout)
+            except requests.exceptions.RequestException as e:
+                print(f"Error sending request: {e}")
+                time.sleep(self._backoff(attempt))
+                continue
+
+            self._track_rate_limit(response)
+            if response.status_code in (200, 204):
                 print("Message sent successfully!")
-            else:
-                raise ValueError(f"Error sending message: {response.status_code}")
-        except ValueError as e:
-            print(f"Error: {e}")
-        except requests.exceptions.RequestException as e:
-            print(f"Error sending request: {e}")
-
-async def send_long_message(channel, message):
-    """Sends a long message to a Discord channel, splitting it if necessary."""
-    if len(message) <= 2000:
-        await channel.send(message)
-        return
-
-    chunks = [message[i:i + 2000] for i in range(0, len(message), 2000)]
-    for chunk in chunks:
-        await channel.send(chunk)
-             
-def extract_payload(email_message):
-    msg = email.message_from_string(email_message)
-    if msg.is_multipart():
-        for part in msg.walk():
-            content_type = part.get_content_type()
-            if content_type == 'text/plain' or content_type == 'text/html':
-                return part.get_payload(decode=True).decode('utf-8')
-    else:
-        return msg.get_payload(decode=True).decode('utf-8')
-    return None
+                return True
+            if response.status_code == 429:
+                retry_after = response.headers.get("Retry-After")
+                if retry_after is None:
+                    try:
+                        retry_after = response.json().get("retry_after", 1)
+                    except ValueError:
+                        retry_after = 1
+                self._blocked_until = max(self._blocked_until, time.monotonic() + float(retry_after))
+                metrics.count('webhook_rate_limited')
+                print(f"Rate limited, retrying in {float(retry_after):.1f}s")
+                continue
+            if response.status_code >= 500:
+                metrics.count('webhook_server_errors')
+                time.sleep(self._backoff(attempt))
+                continue
+            print(f"Error: Error sending message: {response.status_code}")
+            return False
+
+        print(f"Error: giving up on message after {self.max_retries + 1} attempts")
+        return False
+
+    def _track_rate_limit(self, response):
+        # Wait for the bucket to reset before the next request instead of hitting a 429
+        if response.headers.get("X-RateLimit-Remaining") == "0":
+            reset_after = response.headers.get("X-RateLimit-Reset-After")
+            if reset_after:
+                self._blocked_until = max(self._blocked_until, time.monotonic() + float(reset_after))
+
+    @staticmethod
+    def _backoff(attempt):
+        return min(30, 2 ** attempt) * (0.5 + random.random() / 2)
 
 def decode_mime_words(s):
     return ''.join(
@@ -99,6 +185,10 @@ def decode_mime_words(s):
     )
 
 def get_gmail_service(user_email):
+    # The Google client libraries are slow to import, so they are loaded on first use
+    from google.oauth2 import service_account
+    from googleapiclient.discovery import build
+
     try:
         logger.debug(f"Loading credentials from: {CLIENT_SECRET_FILE}")
         credentials = service_account.Credentials.from_service_account_file(CLIENT_SECRET_FILE, scopes=SCOPES)
@@ -127,60 +217,318 @@ def get_latest_unread_message(service, user_id, label="finance/nord"):
 
 def get_message_content(service, user_id, msg_id):
     message = service.users().messages().get(userId=user_id, id=msg_id, format='raw').execute()
-    msg_str = base64.urlsafe_b64decode(message['raw'].encode('ASCII'))
-    return msg_str.decode("utf-8")
+    # Kept as bytes: each part is decoded with its own charset later
+    return base64.urlsafe_b64decode(message['raw'].encode('ASCII'))
+
+def list_unread_messages(service, user_id, label="finance/nord"):
+    """Returns the IDs of every unread message with the label, oldest first."""
+    query = f'label:{label} is:unread'
+    message_ids = []
+    page_token = None
+    with metrics.span('gmail_list') as fields:
+        while True:
+            response = service.users().messages().list(userId=user_id, q=query, pageToken=page_token).execute()
+            message_ids.extend(message['id'] for message in response.get('messages', []))
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                break
+        fields['messages'] = len(message_ids)
+    message_ids.reverse()
+    return message_ids
+
+def get_messages_content(service, user_id, msg_ids):
+    """Fetches raw message bodies through Gmail batch requests. Returns a dict of ID to content."""
+    contents = {}
+
+    def store(request_id, response, exception):
+        if exception is not None:
+            logger.error(f"Error fetching message {request_id}: {exception}")
+            return
+        contents[request_id] = base64.urlsafe_b64decode(response['raw'].encode('ASCII'))
+
+    with metrics.span('gmail_fetch') as fields:
+        for start in range(0, len(msg_ids), GMAIL_BATCH_SIZE):
+            batch = service.new_batch_http_request(callback=store)
+            for msg_id in msg_ids[start:start + GMAIL_BATCH_SIZE]:
+                batch.add(service.users().messages().get(userId=user_id, id=msg_id, format='raw'), request_id=msg_id)
+            batch.execute()
+        fields['messages'] = len(contents)
+        fields['bytes'] = sum(len(content) for content in contents.values())
+    metrics.count('gmail_bytes', fields['bytes'])
+    return contents
+
+def get_label_id(service, user_id, label):
+    labels = service.users().labels().list(userId=user_id).execute().get('labels', [])
+    for item in labels:
+        if item['name'].lower() == label.lower():
+            return item['id']
+    raise ValueError(f"Label not found: {label}")
+
+def get_current_history_id(service, user_id):
+    return service.users().getProfile(userId=user_id).execute()['historyId']
+
+def list_history_messages(service, user_id, label_id, start_history_id):
+    """
+    Lists unread messages that gained the label since start_history_id.
+
+    Returns:
+        tuple: The message IDs, oldest first, and the history ID to resume from.
+    """
+    message_ids = []
+    page_token = None
+    while True:
+        response = service.users().history().list(
+            userId=user_id,
+            startHistoryId=start_history_id,
+            labelId=label_id,
+            historyTypes=['messageAdded', 'labelAdded'],
+            pageToken=page_token,
+        ).execute()
+        for record in response.get('history', []):
+            for added in record.get('messagesAdded', []) + record.get('labelsAdded', []):
+                message = added['message']
+                labels = message.get('labelIds', [])
+                if 'UNREAD' in labels and label_id in labels and message['id'] not in message_ids:
+                    message_ids.append(message['id'])
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            return message_ids, response['historyId']
 
 def mark_message_as_read(service, user_id, msg_id):
     service.users().messages().modify(userId=user_id, id=msg_id, body={'removeLabelIds': ['UNREAD']}).execute()
 
+def mark_messages_as_read(service, user_id, msg_ids):
+    # batchModify accepts up to 1000 IDs per call
+    with metrics.span('gmail_modify', messages=len(msg_ids)):
+        for start in range(0, len(msg_ids), 1000):
+            service.users().messages().batchModify(
+                userId=user_id, body={'ids': msg_ids[start:start + 1000], 'removeLabelIds': ['UNREAD']}
+            ).execute()
+
+def structure_message(msg_content):
+    msg = email.message_from_bytes(msg_content)
+    title = decode_mime_words(msg.get('Subject', ''))
+    content = extract_text(msg)
+
+    # Compared with the first text part, which is what used to be sent to the model
+    raw_tokens = estimate_tokens(first_text_part(msg))
+    tokens = estimate_tokens(content)
+    metrics.count('email_tokens_saved', raw_tokens - tokens)
+    metrics.event('email_text', title=title, raw_tokens=raw_tokens, tokens=tokens)
+    logger.info(f"'{title}': about {raw_tokens} tokens reduced to {tokens}")
+    return {
+        "title": title,
+        "content": content
+    }
+
 def fetch_structured_emails(user_email, label):
     service = get_gmail_service(user_email)
     message_id = get_latest_unread_message(service, user_email, label)
     if message_id:
         msg_content = get_message_content(service, user_email, message_id)
-        msg = email.message_from_string(msg_content)
-        headers = msg.items()
-        subject = msg.get('Subject', '')
-        structured_message = {
-            "title": decode_mime_words(subject),
-            "content": extract_payload(msg_content)
-        }
-        mark_message_as_read(service, user_email, message_id)  # Mark as read after processing
+        structured_message = structure_message(msg_content)
+        # Marked as read by the caller, once the analysis has been delivered
+        structured_message["id"] = message_id
         return structured_message
     return None
 
+summary_cache = SummaryCache(CACHE_PATH, ttl=CACHE_TTL, max_bytes=int(CACHE_MAX_MB * 1024 * 1024))
+models = ModelRegistry("ai-1684952810", "us-central1")
+scheduler = Scheduler(models)
+
 def generate_text(text_blob, prompt):
-    vertexai.init(project="ai-1684952810", location="us-central1")
-    model = GenerativeModel("gemini-1.5-flash-001")
-    generation_config = {
-        "max_output_tokens": 8192,
-        "temperature": 1,
-        "top_p": 0.95,
-    }
-    safety_settings = {
-        generative_models.HarmCategory.HARM_CATEGORY_HATE_SPEECH: generative_models.HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-        generative_models.HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: generative_models.HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-        generative_models.HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: generative_models.HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-        generative_models.HarmCategory.HARM_CATEGORY_HARASSMENT: generative_models.HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
+    key = content_key(text_blob, prompt, MODEL_NAME, GENERATION_CONFIG)
+    return summary_cache.get_or_compute(key, lambda: _generate_text(text_blob, prompt))
+
+def _generate_text(text_blob, prompt):
+    return scheduler.generate(MODEL_NAME, [f"{prompt} {text_blob}"], generation_config=GENERATION_CONFIG, safety=True)
+
+def post_analysis(webhook, title, content):
+    """
+    Queues the analysis for the webhook.
+
+    Returns:
+        Future: Resolves to whether the analysis was delivered. Alerts are not
+        posted and count as delivered.
+    """
+    if title != "ALERTA - Operação Anti-Trader":
+        message = f"Titulo: {title}\n{content}"
+        metrics.count('analysis_chars', len(message))
+        metrics.count('analysis_words', len(message.split()))
+        metrics.event('analysis', title=title, chars=len(message), words=len(message.split()))
+        return webhook.send_message(message)
+    skipped = Future()
+    skipped.set_result(True)
+    return skipped
+
+def analyze_message(message):
+    try:
+        return generate_text(message["content"], PROMPT)
+    except Exception as e:
+        logger.error(f"Error analyzing message '{message['title']}': {str(e)}")
+        return None
+
+def process_messages(service, user_email, message_ids, webhook, concurrency=ANALYSIS_CONCURRENCY):
+    """
+    Analyzes the given messages and posts the results in order.
+
+    Messages are fetched in Gmail batches and analyzed concurrently. Only the
+    messages whose analysis succeeded and was delivered to the webhook are
+    marked as read, in a single call.
+
+    Returns:
+        tuple: The IDs that were processed and the IDs that failed.
+    """
+    contents = get_messages_content(service, user_email, message_ids)
+    messages = [(msg_id, structure_message(contents[msg_id])) for msg_id in message_ids if msg_id in contents]
+    logger.info(f"Processing {len(messages)} unread messages")
+
+    posted = []
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        # map() yields in submission order, so each analysis is posted as soon as it and its predecessors are done
+        analyses = pool.map(analyze_message, [message for _, message in messages])
+        for (msg_id, message), content in zip(messages, analyses):
+            if content is None:
+                continue
+            posted.append((msg_id, post_analysis(webhook, message["title"], content)))
+    webhook.flush()
+
+    processed = [msg_id for msg_id, delivered in posted if delivered.result()]
+    if len(processed) < len(posted):
+        logger.error(f"{len(posted) - len(processed)} analyses were not delivered, their emails stay unread")
+
+    if processed:
+        mark_messages_as_read(service, user_email, processed)
+    failed = [msg_id for msg_id in message_ids if msg_id not in processed]
+    return processed, failed
+
+def process_backlog(user_email, label, concurrency=ANALYSIS_CONCURRENCY):
+    """
+    Analyzes every unread message with the label.
+
+    Returns:
+        int: The number of messages processed.
+    """
+    service = get_gmail_service(user_email)
+    message_ids = list_unread_messages(service, user_email, label)
+    if not message_ids:
+        return 0
+    processed, _ = process_messages(service, user_email, message_ids, DiscordWebhook(), concurrency)
+    return len(processed)
+
+def run_daemon(user_email, label, interval=POLL_INTERVAL, concurrency=ANALYSIS_CONCURRENCY):
+    """
+    Keeps the Gmail client warm and processes new messages as they arrive.
+
+    After an initial pass over the unread backlog, only the mailbox history
+    since the last seen historyId is read on each poll, which is a single cheap
+    call when nothing changed. The historyId is persisted so a restart resumes
+    where the previous process stopped.
+
+    The historyId only moves forward once the messages it covers have been
+    processed. Messages that failed are retried on the next polls, up to
+    MAX_ATTEMPTS times in total, and the attempt counts are persisted too.
+    Messages given up on are remembered until they are no longer unread or
+    GIVE_UP_TTL has passed, so the persisted state does not keep growing.
+    """
+    from googleapiclient.errors import HttpError
+
+    service = get_gmail_service(user_email)
+    label_id = get_label_id(service, user_email, label)
+    webhook = DiscordWebhook()
+    state = DiskCache(CACHE_PATH, 'state')
+    state_key = f"history:{user_email}:{label}"
+    retry_key = f"retry:{user_email}:{label}"
+
+    saved = state.get(state_key)
+    history_id = saved.decode('utf-8') if saved is not None else None
+    # {message ID: {'attempts': failed attempts, 'time': last failure}}. Entries at MAX_ATTEMPTS
+    # are kept for a while so a full sync does not pick the message up again.
+    retry = {
+        msg_id: entry if isinstance(entry, dict) else {'attempts': entry, 'time': time.time()}
+        for msg_id, entry in (state.get_json(retry_key) or {}).items()
     }
-    responses = model.generate_content(
-        [f"{prompt} {text_blob}"],
-        generation_config=generation_config,
-        safety_settings=safety_settings,
-        stream=True,
-    )
-    generated_text = ""
-    for response in responses:
-        generated_text += response.text
-    return generated_text
+
+    def record_failures(failed):
+        if not failed:
+            return
+        for msg_id in failed:
+            entry = retry.setdefault(msg_id, {'attempts': 0})
+            entry['attempts'] += 1
+            entry['time'] = time.time()
+            if entry['attempts'] == MAX_ATTEMPTS:
+                logger.error(f"Giving up on message {msg_id} after {MAX_ATTEMPTS} attempts, it stays unread")
+        state.set_json(retry_key, retry)
+
+    def prune_retry(unread=None):
+        """Forgets messages given up on longer than GIVE_UP_TTL ago and, after a full sync, read ones."""
+        expired = [
+            msg_id for msg_id, entry in retry.items()
+            if (entry['attempts'] >= MAX_ATTEMPTS and time.time() - entry['time'] > GIVE_UP_TTL)
+            or (unread is not None and msg_id not in unread)
+        ]
+        for msg_id in expired:
+            del retry[msg_id]
+        if expired:
+            state.set_json(retry_key, retry)
+
+    while True:
+        message_ids = []
+        try:
+            if history_id is None:
+                # Full sync: take the history position first so nothing arriving during the scan is missed
+                next_history_id = get_current_history_id(service, user_email)
+                new_ids = list_unread_messages(service, user_email, label)
+                prune_retry(set(new_ids))
+            else:
+                with metrics.span('gmail_history'):
+                    new_ids, next_history_id = list_history_messages(service, user_email, label_id, history_id)
+                prune_retry()
+            pending = [msg_id for msg_id, entry in retry.items() if entry['attempts'] < MAX_ATTEMPTS]
+            message_ids = pending + [msg_id for msg_id in new_ids if msg_id not in retry]
+            if message_ids:
+                processed, failed = process_messages(service, user_email, message_ids, webhook, concurrency)
+                for msg_id in processed:
+                    retry.pop(msg_id, None)
+                record_failures(failed)
+            # Only now are the messages up to next_history_id handled
+            history_id = next_history_id
+            state.set(state_key, str(history_id).encode('utf-8'))
+        except HttpError as e:
+            if e.resp.status == 404:
+                logger.warning("Gmail history expired, running a full sync")
+                history_id = None
+                continue
+            logger.error(f"Gmail error while polling: {str(e)}")
+            record_failures(message_ids)
+        except Exception as e:
+            logger.error(f"An error occurred while polling: {str(e)}")
+            # history_id was not advanced, so these are listed again; the attempt still counts
+            record_failures(message_ids)
+        time.sleep(interval)
 
 def main():
     parser = argparse.ArgumentParser(description='Fetch and analyze Gmail messages.')
     parser.add_argument('--user_email', '-e', type=str, required=True, help='User email address')
     parser.add_argument('--label', '-l', type=str, required=True, help='Email label to filter')
+    parser.add_argument('--backlog', '-b', action='store_true', help='Process every unread message instead of only the latest one')
+    parser.add_argument('--concurrency', '-c', type=int, default=ANALYSIS_CONCURRENCY, help='Concurrent analyses in backlog mode')
+    parser.add_argument('--daemon', '-d', action='store_true', help='Keep running and process new messages as they arrive')
+    parser.add_argument('--interval', '-i', type=float, default=POLL_INTERVAL, help='Seconds between mailbox polls in daemon mode')
     args = parser.parse_args()
+    metrics.configure(bot='nord-news-bot')
 
     try:
+        if args.daemon:
+            logging.basicConfig(level=logging.INFO)
+            metrics.serve()
+            run_daemon(args.user_email, args.label, args.interval, args.concurrency)
+            return
+
+        if args.backlog:
+            process_backlog(args.user_email, args.label, args.concurrency)
+            return
+
         message = fetch_structured_emails(
             user_email=args.user_email,
             label=args.label
@@ -189,17 +537,20 @@ def main():
             title = message["title"]
             content = message["content"]
             content = generate_text(content, PROMPT)
-            if title != "ALERTA - Operação Anti-Trader":
-                message = f"Titulo: {title}\n{content}"
-                # print(message)
-                print(f"this message has: {len(message)} characters")
-                print(f"this message has: {len(message.split())} words")
-                webhook = DiscordWebhook()
-                webhook.send_message(message)
+            webhook = DiscordWebhook()
+            delivered = post_analysis(webhook, title, content)
+            webhook.flush()
+            if not delivered.result():
+                logger.error(f"The analysis of '{title}' was not delivered, the email stays unread")
+                sys.exit(1)
+            mark_message_as_read(get_gmail_service(args.user_email), args.user_email, message["id"])
 
     except Exception as e:
         logger.error(f"An error occurred: {str(e)}")
         sys.exit(1)
+    finally:
+        # One summary line per run, so cron invocations can be compared in the JSON log
+        metrics.event('snapshot', **metrics.snapshot())
         
 if __name__ == '__main__':
     main()
\ No newline at end of file
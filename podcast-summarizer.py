@@ -1,25 +1,40 @@
+import asyncio
 import discord
 import re
 import os
-from playwright.async_api import async_playwright
-
-import base64
-import vertexai
-from vertexai.generative_models import GenerativeModel, Part, FinishReason
-import vertexai.preview.generative_models as generative_models
-
-import requests
 import os
-from urllib.parse import urlparse
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from discord_agents.audio import audio_part, audio_segments, segmenting_available
+from discord_agents.cache import SummaryCache, content_key, file_digest
+from discord_agents.downloads import DownloadError, Downloader
+from discord_agents.feeds import FeedPoller
+from discord_agents.formatting import format_offset, send_long_message
+from discord_agents.jobs import JobQueue, QueueFull, run_blocking
+from discord_agents.metrics import metrics
+from discord_agents.models import DEFAULT_GENERATION_CONFIG, ModelRegistry
+from discord_agents.scheduler import Scheduler
+from discord_agents.scraping import fetch_podcast_info_browser, fetch_podcast_info_http, http_session
+from discord_agents.streaming import STREAM_RESPONSES, MessageStreamer
 
-PROJECT_ID = os.getenv('VERTEX_IA_PROJECT') 
-REGION = os.getenv('VERTEX_IA_REGION')
 DEPENDENCIES_FOLDER ='/mnt/common' 
 INBOX_CHANNEL = 'podcast-summarizer'
 url_pattern = re.compile(r'https?://\S+')
 DOWNLOAD_FOLDER = 'downloads'
 
 DISCORD_TOKEN = os.getenv('DISCORD_TOKEN_PODCASTS')
+CACHE_PATH = os.getenv('PODCAST_CACHE_PATH', 'cache/podcast.sqlite3')
+CACHE_TTL = float(os.getenv('PODCAST_CACHE_TTL_HOURS', '168')) * 3600
+CACHE_MAX_MB = float(os.getenv('PODCAST_CACHE_MAX_MB', '64'))
+SUMMARY_MODEL = "gemini-1.5-flash-001"
+GENERATION_CONFIG = DEFAULT_GENERATION_CONFIG
+# Episodes longer than one segment are summarized as overlapping windows in parallel
+SEGMENT_MINUTES = float(os.getenv('PODCAST_SEGMENT_MINUTES', '20'))
+SEGMENT_OVERLAP_SECONDS = float(os.getenv('PODCAST_SEGMENT_OVERLAP_SECONDS', '30'))
+SEGMENT_PARALLELISM = int(os.getenv('PODCAST_SEGMENT_PARALLELISM', '4'))
+# RSS/Atom feeds whose new episodes are summarized into the inbox channel, comma separated
+FEEDS = [feed.strip() for feed in os.getenv('PODCAST_FEEDS', '').split(',') if feed.strip()]
+FEED_POLL_INTERVAL = float(os.getenv('PODCAST_FEED_POLL_MINUTES', '30')) * 60
 
 PROMPT = """
 # ANALYSIS INSTRUCTIONS:
@@ -33,18 +48,21 @@ PROMPT = """
 - Please disregard from the content any adverstisements or sponsored products or services.
 """
 
-def encode_mp3_to_base64(file_path):
-    try:
-        with open(file_path, "rb") as mp3_file:
-            mp3_content = mp3_file.read()
-            base64_encoded = base64.b64encode(mp3_content).decode('utf-8')
-        return base64_encoded
-    except FileNotFoundError:
-        print(f"File not found: {file_path}")
-        return None
-    except Exception as e:
-        print(f"An error occurred: {e}")
-        return None
+PROMPT_SEGMENT = """
+# ANALYSIS INSTRUCTIONS:
+- Purpose: You are given one segment ({start} to {end}) of a longer podcast episode. Take notes on this segment only, they will be merged with the notes from the other segments.
+# OUTPUT format (mandatory):
+- ## Participants: (provide the name of the participants speaking in this segment, provide Twitter handles, websites, and Linkedin profiles if mentioned)
+- ## Key points: (the main topics and arguments of this segment, as bullet points)
+- ## Quotes: (Up to 5 most important quotes extracted from this segment, including the owner of the quote)
+- ## Q&A: (Up to 5 of the most interesting or provocative questions/answers pairs in this segment)
+- Please disregard from the content any adverstisements or sponsored products or services.
+"""
+
+PROMPT_MERGE = """
+# CONTEXT:
+- The podcast episode is presented to you as notes taken from consecutive segments of the episode, in order. Consecutive segments overlap by a few seconds, so ignore content repeated at their boundaries.
+"""
 
 def slugify(filename):
   filename = re.sub(r'[^a-zA-Z0-9_\s]', '', filename)  # Remove special characters
@@ -54,104 +72,62 @@ def slugify(filename):
     filename += '.mp3'  # Enforce .mp3 extension
   return filename
 
-async def send_long_message(channel, message):
-    """Sends a long message to a Discord channel, splitting it if necessary."""
-    if len(message) <= 2000:
-        await channel.send(message)
-        return
-
-    chunks = [message[i:i + 2000] for i in range(0, len(message), 2000)]
-    for chunk in chunks:
-        await channel.send(chunk)
-
 async def extract_podcast_info(url):
-    async with async_playwright() as p:
-        browser = await p.chromium.launch()
-        page = await browser.new_page()
-        await page.goto(url)
-
-        try:
-            podcast_title = await page.evaluate("document.querySelector('meta[property=\"og:title\"]').content")
-            podcast_title = podcast_title.split(' - ')[1].strip()
-
-            episode_title = await page.evaluate("document.querySelector('meta[property=\"og:title\"]').content")
-            episode_title = episode_title.split(' - ')[0].strip()
-
-            download_url = await page.evaluate("document.querySelector('a.download-button').href")
-            release_date = await page.evaluate("document.querySelector('#episode_date').textContent")
-            release_date = release_date.strip()
-
-            result = {
-                'podcast_title': podcast_title,
-                'episode_title': episode_title,
-                'download_url': download_url,
-                'release_date': release_date,
-            }
-            return result
-        except Exception as e:
-            print(f"Error extracting podcast information: {e}")
-            return None
-        finally:
-            await browser.close()
-
-def download_podcast(url, download_folder):
-    try:
-        response = requests.get(url, allow_redirects=True, stream=True)
-        response.raise_for_status()
+    # Fast path: plain HTTP fetch of the server-rendered page
+    result = await run_blocking('metadata', fetch_podcast_info_http, url)
+    if result:
+        return result
 
-        # Get the final URL after potential redirects
-        final_url = response.url
-
-        # Extract filename from URL or Content-Disposition header
-        content_disposition = response.headers.get('Content-Disposition')
-        if content_disposition:
-            filename = re.findall("filename=(.+)", content_disposition)[0].strip('"')
-        else:
-            filename = os.path.basename(urlparse(final_url).path)
+    try:
+        return await fetch_podcast_info_browser(url)
+    except Exception as e:
+        print(f"Error extracting podcast information: {e}")
+        return None
 
-        file_path = os.path.join(download_folder, filename)
+def download_podcast(url):
+    try:
+        file_path = downloader.download(url)
+    except DownloadError as e:
+        print(f"Error downloading podcast: {e}")
+        return None
 
-        with open(file_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
-                    f.write(chunk)
+    print(f"Successfully downloaded: {os.path.basename(file_path)}")
+    return file_path
 
-        print(f"Successfully downloaded: {filename}")
-        return file_path
+summary_cache = SummaryCache(CACHE_PATH, ttl=CACHE_TTL, max_bytes=int(CACHE_MAX_MB * 1024 * 1024))
+models = ModelRegistry()
+scheduler = Scheduler(models)
 
-    except requests.RequestException as e:
-        print(f"Error downloading podcast: {e}")
-        return None
-    
-def generate_summary(audio_file):
-    vertexai.init(project=PROJECT_ID, location=REGION)
-    model = GenerativeModel(
-    "gemini-1.5-flash-001",
-    )
-    audio_file_encoded = encode_mp3_to_base64(audio_file)
-    audio_data = Part.from_data(mime_type="audio/mpeg", data=base64.b64decode(audio_file_encoded))
-    generation_config = {
-    "max_output_tokens": 8192,
-    "temperature": 1,
-    "top_p": 0.95,
-    }
-    
-    safety_settings = {
-        generative_models.HarmCategory.HARM_CATEGORY_HATE_SPEECH: generative_models.HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-        generative_models.HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: generative_models.HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-        generative_models.HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: generative_models.HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-        generative_models.HarmCategory.HARM_CATEGORY_HARASSMENT: generative_models.HarmBlockThreshold.BLOCK_MEDIUM_AND_ABOVE,
-    }
-    
-    response = model.generate_content(
-        [ audio_data, PROMPT],
-        generation_config=generation_config,
-        safety_settings=safety_settings,
-        stream=False,
+def generate_summary(audio_file, on_chunk=None):
+    key = content_key(
+        file_digest(audio_file), PROMPT, PROMPT_SEGMENT, PROMPT_MERGE, SUMMARY_MODEL, GENERATION_CONFIG,
+        SEGMENT_MINUTES, SEGMENT_OVERLAP_SECONDS,
     )
-    output = response.candidates[0].content.parts[0].text
-    
-    return output
+    return summary_cache.get_or_compute(key, lambda: _generate_summary(audio_file, on_chunk), on_hit=on_chunk)
+
+def generate_llm(contents, on_chunk=None):
+    return scheduler.generate(SUMMARY_MODEL, contents, on_chunk, GENERATION_CONFIG, safety=True)
+
+def _summarize_segment(start, end, segment_file):
+    prompt = PROMPT_SEGMENT.format(start=format_offset(start), end=format_offset(end))
+    with audio_part(segment_file) as audio_data:
+        notes = generate_llm([audio_data, prompt])
+    return f"# Segment {format_offset(start)} - {format_offset(end)}\n{notes}"
+
+def _generate_summary(audio_file, on_chunk=None):
+    if not segmenting_available():
+        with audio_part(audio_file) as audio_data:
+            return generate_llm([audio_data, PROMPT], on_chunk)
+
+    with audio_segments(audio_file, SEGMENT_MINUTES * 60, SEGMENT_OVERLAP_SECONDS) as segments:
+        if len(segments) == 1:
+            with audio_part(audio_file) as audio_data:
+                return generate_llm([audio_data, PROMPT], on_chunk)
+
+        # Map: take notes on every window concurrently, then reduce them into the final format
+        with ThreadPoolExecutor(max_workers=SEGMENT_PARALLELISM, thread_name_prefix='podcast-segment') as pool:
+            notes = list(pool.map(lambda segment: _summarize_segment(*segment), segments))
+    return generate_llm(["\n\n".join(notes), PROMPT_MERGE, PROMPT], on_chunk)
  
 ####################################################
 #
@@ -163,11 +139,85 @@ intents.message_content = True
 # Create the bot instance
 client = discord.Client(intents=intents)
 
-# Ensure the download folder exists
-os.makedirs(DOWNLOAD_FOLDER, exist_ok=True)
+# Creates the download folder and keeps it within its quota
+downloader = Downloader(DOWNLOAD_FOLDER)
+
+job_queue = JobQueue()
+
+feed_poller = FeedPoller(CACHE_PATH, http_session)
+# Feed episodes queued and not finished yet, so a poll does not queue them twice
+feed_episodes_queued = set()
+feed_task = None
+
+async def process_podcast(channel, url):
+    result = await extract_podcast_info(url)
+    if not result:
+        await channel.send(f'Failed to download content')
+        return
+    await summarize_episode(channel, result)
+
+async def summarize_episode(channel, result):
+    download = await run_blocking('download', download_podcast, result["download_url"])
+    if not download:
+        await channel.send(f'Failed to download content')
+        return False
+
+    try:
+        # The episode details go out with the first part of the summary, saving a round trip
+        podcastdata = f'Podcast Title: {result["podcast_title"]}\nEpisode: {result["episode_title"]}\nRelease Date: {result["release_date"]}'
+        if STREAM_RESPONSES:
+            async with MessageStreamer(channel, prefix=f'{podcastdata}\n\n') as streamer:
+                await run_blocking('llm', generate_summary, download, streamer.feed)
+        else:
+            summary = await run_blocking('llm', generate_summary, download)
+            await send_long_message(channel, f'{podcastdata}\n\n{summary}')
+    finally:
+        # Also on failure, so episodes never pile up in the download folder
+        downloader.release(download)
+    return True
+
+async def process_feed_episode(channel, feed_url, episode):
+    succeeded = False
+    try:
+        succeeded = await summarize_episode(channel, episode)
+    finally:
+        feed_episodes_queued.discard((feed_url, episode["guid"]))
+        await run_blocking('metadata', feed_poller.complete, feed_url, episode, succeeded)
+
+async def poll_feeds(channel):
+    # The feed enclosures go straight to the downloader, no episode page or browser involved
+    while True:
+        for feed_url in FEEDS:
+            try:
+                episodes = await run_blocking('metadata', feed_poller.poll, feed_url)
+            except Exception as e:
+                # One broken feed must not stop the others, or the next polls
+                print(f"Error polling feed {feed_url}: {e}")
+                continue
+            for episode in episodes:
+                key = (feed_url, episode["guid"])
+                if key in feed_episodes_queued:
+                    continue
+                try:
+                    job_queue.submit(channel.id, partial(process_feed_episode, channel, feed_url, episode))
+                except QueueFull:
+                    # Still pending in the feed state, so the next poll queues it again
+                    break
+                feed_episodes_queued.add(key)
+        await asyncio.sleep(FEED_POLL_INTERVAL)
 
 @client.event
 async def on_ready():
+    metrics.configure(bot='podcast-summarizer')
+    metrics.serve()
+    await run_blocking('download', downloader.cleanup)
+    await run_blocking('llm', models.warm_up, SUMMARY_MODEL, GENERATION_CONFIG, safety=True)
+    global feed_task
+    channel = discord.utils.get(client.get_all_channels(), name=INBOX_CHANNEL)
+    # on_ready runs again after reconnects; only one poller is started
+    if FEEDS and channel and feed_task is None:
+        feed_task = asyncio.create_task(poll_feeds(channel))
+        print(f'Polling {len(FEEDS)} podcast feeds every {FEED_POLL_INTERVAL / 60:g} minutes.')
     print(f'Podcast Summarizer has started.')
 
 @client.event
@@ -182,22 +232,7 @@ async def on_message(message):
         urls = url_pattern.findall(message.content)
         if urls:
             for url in urls:
-                result = await extract_podcast_info(url)
-                if result:
-                    download = download_podcast(result["download_url"], DOWNLOAD_FOLDER)
-                    if download:
-                        await message.channel.send(f'\n\nPodcast Title: {result["podcast_title"]}\nEpisode: {result["episode_title"]}\nRelease Date: {result["release_date"]}')
-                        summary = generate_summary(download)
-                        if len(summary) > 2000:
-                            # summary = summary[:2000]
-                            await send_long_message(message.channel, f'\n{summary}')
-                            # await message.channel.send(f'\n{summary}')
-                        try:
-                            os.remove(download)
-                        except Exception as e:
-                            print(f"Error removing file: {download} - {e}")
-                else:
-                    await message.channel.send(f'Failed to download content')
-
-client.run(DISCORD_TOKEN)
+                await job_queue.enqueue(message.channel, partial(process_podcast, message.channel, url))
 
+if __name__ == '__main__':
+    client.run(DISCORD_TOKEN)
@@ -1,21 +1,52 @@
 import discord
 import re
 import os
-from youtube_transcript_api import YouTubeTranscriptApi
 from urllib.parse import urlparse, parse_qs
 from datetime import datetime
 import json
-from googleapiclient.discovery import build
-import vertexai
-from vertexai.generative_models import GenerativeModel, Part
 from collections import deque
+from functools import partial
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from discord_agents.cache import DiskCache, SummaryCache, content_key
+from discord_agents.formatting import format_offset, send_long_message
+from discord_agents.jobs import JobQueue, run_blocking
+from discord_agents.metrics import metrics
+from discord_agents.models import DEFAULT_GENERATION_CONFIG, ModelRegistry, estimate_tokens
+from discord_agents.scheduler import BULK, INTERACTIVE, LIGHT_MODEL_MAX_TOKENS, Scheduler
+from discord_agents.retrieval import BM25Index
+from discord_agents.streaming import STREAM_RESPONSES, MessageStreamer
+from discord_agents.transcripts import clean_entries, transcript_text as render_transcript
 
-PROJECT_ID = os.getenv('VERTEX_IA_PROJECT') 
-REGION = os.getenv('VERTEX_IA_REGION')
 DISCORD_TOKEN = os.getenv('DISCORD_TOKEN_YOUTUBES')
 YOUTUBE_DATA_API_KEY = os.getenv('YOUTUBE_DATA_API_KEY')
 INBOX_CHANNEL = 'youtube-summarizer'
+CACHE_PATH = os.getenv('YOUTUBE_CACHE_PATH', 'cache/youtube.sqlite3')
+CACHE_TTL = float(os.getenv('YOUTUBE_CACHE_TTL_HOURS', '168')) * 3600
+CACHE_MAX_MB = float(os.getenv('YOUTUBE_CACHE_MAX_MB', '256'))
+SUMMARY_MODEL = "gemini-1.5-pro"
+# Short videos, /ask answers and calls made while the summary model is slow or rate limited go here; empty to disable
+LIGHT_MODEL = os.getenv('YOUTUBE_LIGHT_MODEL', 'gemini-1.5-flash-001')
+GENERATION_CONFIG = {**DEFAULT_GENERATION_CONFIG, "temperature": 0.7}
+# Transcripts longer than this are summarized chunk by chunk in parallel, then reduced
+CHUNKED_SUMMARY_CHARS = int(os.getenv('YOUTUBE_CHUNKED_SUMMARY_CHARS', '150000'))
+CHUNK_CHARS = int(os.getenv('YOUTUBE_CHUNK_CHARS', '50000'))
+CHUNK_PARALLELISM = int(os.getenv('YOUTUBE_CHUNK_PARALLELISM', '4'))
+# /ask sends only the best matching transcript passages ("retrieval") or the whole transcript ("full")
+QA_MODE = os.getenv('YOUTUBE_QA_MODE', 'retrieval')
+QA_TOP_K = int(os.getenv('YOUTUBE_QA_TOP_K', '8'))
+QA_PASSAGE_CHARS = int(os.getenv('YOUTUBE_QA_PASSAGE_CHARS', '1200'))
+# Each channel remembers its last few videos for /ask; transcripts are dropped from memory LRU-first
+CONTEXTS_PER_CHANNEL = int(os.getenv('YOUTUBE_CONTEXTS_PER_CHANNEL', '5'))
+CONTEXT_TTL = float(os.getenv('YOUTUBE_CONTEXT_TTL_HOURS', '72')) * 3600
+CONTEXT_MEMORY_MB = float(os.getenv('YOUTUBE_CONTEXT_MEMORY_MB', '64'))
+# Strip caption noise (repeated lines, [Music], filler words) before sending transcripts to the model
+CLEAN_TRANSCRIPTS = os.getenv('YOUTUBE_CLEAN_TRANSCRIPTS', 'true').lower() in ('1', 'true', 'yes')
+TIMESTAMP_INTERVAL = float(os.getenv('YOUTUBE_TIMESTAMP_SECONDS', '60'))
 url_pattern = re.compile(r'https?://(?:www\.)?youtube\.com/watch\?v=[\w-]+')
+ask_pattern = re.compile(r'/ask\s*(?:#(\d+)\s+)?(.*)', re.DOTALL)
 
 
 PROMPT_SUMMARY = """
@@ -31,22 +62,138 @@ Purpose: Your job is to provide a summary of the YouTube video presented to you,
 - Please disregard from the content any adverstisements or sponsored products or services.
 """
 
+PROMPT_CHUNK = """
+# ANALYSIS INSTRUCTIONS:
+Purpose: You are given one part ({start} to {end}) of the transcript of a longer YouTube video. Take notes on this part only, they will be merged with the notes from the other parts.
+
+# OUTPUT format (mandatory):
+- ## Participants: (provide the name of the participants speaking in this part, provide Twitter handles, websites, and Linkedin profiles if mentioned)
+- ## Key points: (the main topics and arguments of this part, as bullet points)
+- ## Quotes: (Up to 5 most important quotes extracted from this part, including the owner of the quote)
+- ## Q&A: (Up to 5 of the most interesting or provocative questions/answers pairs in this part)
+- Please disregard from the content any adverstisements or sponsored products or services.
+"""
+
+PROMPT_REDUCE = """
+# CONTEXT:
+The YouTube video is presented to you as notes taken from consecutive parts of its transcript, in order.
+"""
+
 PROMPT_QA = """
 Using the context, conversation history, and video transcript provided to you, respond to the following question with the best of your knowledge, using only information provided to you:
 """
 
 class VideoContext:
-    def __init__(self):
-        self.reset()
+    """
+    A processed video that /ask questions can refer to.
 
-    def reset(self):
-        self.url = None
+    The transcript and its retrieval index are only held while needed; load()
+    brings them back from the transcript cache after they have been evicted.
+    """
+    __slots__ = (
+        'video_id', 'url', 'title', 'channel', 'release_date', 'summary',
+        'conversation_history', 'last_used', 'transcript', 'index',
+    )
+
+    def __init__(self, video_id, url, title=None, channel=None, release_date=None, summary=None,
+                 conversation_history=(), last_used=None):
+        self.video_id = video_id
+        self.url = url
+        self.title = title
+        self.channel = channel
+        self.release_date = release_date
+        self.summary = summary
+        self.conversation_history = deque((tuple(pair) for pair in conversation_history), maxlen=10)
+        self.last_used = last_used or time.time()
+        self.transcript = None
+        self.index = None
+
+    def load(self):
+        """Reloads the transcript and its index if they were evicted. Blocking."""
+        if self.transcript is None:
+            entries = get_transcript_entries(self.video_id)
+            self.transcript = transcript_text(entries)
+            self.index = build_transcript_index(entries)
+
+    def unload(self):
         self.transcript = None
-        self.title = None
-        self.channel = None
-        self.release_date = None
-        self.conversation_history = deque(maxlen=10)
-        self.summary = None
+        self.index = None
+
+    def memory_size(self):
+        # The index holds roughly as much again as the transcript itself
+        return 2 * len(self.transcript) if self.transcript else 0
+
+    def to_dict(self):
+        return {
+            "video_id": self.video_id,
+            "url": self.url,
+            "title": self.title,
+            "channel": self.channel,
+            "release_date": self.release_date,
+            "summary": self.summary,
+            "conversation_history": list(self.conversation_history),
+            "last_used": self.last_used,
+        }
+
+class ContextStore:
+    """
+    The most recent VideoContexts of each channel, newest first.
+
+    Contexts expire after a TTL, loaded transcripts are evicted least recently
+    used first once they exceed the memory budget, and everything except the
+    transcripts is persisted so /ask keeps working after a restart.
+    """
+
+    def __init__(self, path, per_channel, ttl, memory_budget):
+        self.per_channel = per_channel
+        self.ttl = ttl
+        self.memory_budget = memory_budget
+        self._db = DiskCache(path, 'contexts', ttl=ttl)
+        self._channels = {}
+
+    def recent(self, channel_id):
+        contexts = self._channels.get(channel_id)
+        if contexts is None:
+            contexts = [VideoContext(**data) for data in self._db.get_json(str(channel_id)) or []]
+        now = time.time()
+        alive = [context for context in contexts if now - context.last_used <= self.ttl]
+        if alive:
+            self._channels[channel_id] = alive
+        else:
+            self._channels.pop(channel_id, None)
+        return alive
+
+    def get(self, channel_id, position=1):
+        """Returns the channel's position-th most recent video, or None."""
+        contexts = self.recent(channel_id)
+        if 0 < position <= len(contexts):
+            return contexts[position - 1]
+        return None
+
+    def add(self, channel_id, video_context):
+        contexts = [context for context in self.recent(channel_id) if context.video_id != video_context.video_id]
+        self._channels[channel_id] = [video_context] + contexts[:self.per_channel - 1]
+        self.touch(video_context)
+        self.save(channel_id)
+
+    def touch(self, video_context):
+        """Marks a context as used and evicts other transcripts if over the memory budget."""
+        video_context.last_used = time.time()
+        loaded = sorted(
+            (context for contexts in self._channels.values() for context in contexts
+             if context.transcript is not None and context is not video_context),
+            key=lambda context: context.last_used,
+        )
+        used = video_context.memory_size() + sum(context.memory_size() for context in loaded)
+        for context in loaded:
+            if used <= self.memory_budget:
+                break
+            used -= context.memory_size()
+            context.unload()
+
+    def save(self, channel_id):
+        contexts = self._channels.get(channel_id, [])
+        self._db.set_json(str(channel_id), [context.to_dict() for context in contexts])
 
 def format_timestamp(timestamp_str):
     try:
@@ -56,14 +203,35 @@ def format_timestamp(timestamp_str):
     except ValueError:
         return None
 
+transcript_cache = DiskCache(CACHE_PATH, 'transcripts', ttl=CACHE_TTL, max_bytes=int(CACHE_MAX_MB * 1024 * 1024))
+metadata_cache = DiskCache(CACHE_PATH, 'metadata', ttl=CACHE_TTL)
+summary_cache = SummaryCache(CACHE_PATH, ttl=CACHE_TTL, max_bytes=int(CACHE_MAX_MB * 1024 * 1024))
+context_store = ContextStore(CACHE_PATH, CONTEXTS_PER_CHANNEL, CONTEXT_TTL, int(CONTEXT_MEMORY_MB * 1024 * 1024))
+models = ModelRegistry()
+scheduler = Scheduler(models)
+
+# googleapiclient objects are not thread-safe, so each worker thread keeps its own client
+_youtube_clients = threading.local()
+
+def get_youtube_client(api_key):
+    clients = _youtube_clients.__dict__
+    if api_key not in clients:
+        from googleapiclient.discovery import build
+        clients[api_key] = build("youtube", "v3", developerKey=api_key)
+    return clients[api_key]
+
 def get_youtube_video_info(api_key, video_url):
     try:
         video_id = video_url.split("v=")[1].split("&")[0]
     except IndexError:
         return None
 
+    cached = metadata_cache.get(video_id)
+    if cached is not None:
+        return cached.decode('utf-8')
+
     try:
-        youtube = build("youtube", "v3", developerKey=api_key)
+        youtube = get_youtube_client(api_key)
         response = youtube.videos().list(part="snippet", id=video_id).execute()
         video_data = response['items'][0]['snippet']
         title = video_data['title']
@@ -74,7 +242,9 @@ def get_youtube_video_info(api_key, video_url):
             "channel": channel,
             "release_date": release_date
         }
-        return json.dumps(output)
+        output = json.dumps(output)
+        metadata_cache.set(video_id, output.encode('utf-8'))
+        return output
     except Exception as e:
         print(f"Error: {e}")
         return None
@@ -83,42 +253,111 @@ def extract_video_id(url):
     query = urlparse(url).query
     return parse_qs(query)['v'][0]
 
+def get_transcript_entries(video_id, clean=CLEAN_TRANSCRIPTS):
+    # The cache keeps the captions as fetched, so changes to the cleaning apply to cached videos too
+    entries = transcript_cache.get_json(video_id)
+    if entries is None:
+        from youtube_transcript_api import YouTubeTranscriptApi
+        # English captions, the API's default and the language clean_entries() assumes
+        entries = YouTubeTranscriptApi.get_transcript(video_id)
+        transcript_cache.set_json(video_id, entries)
+    return clean_entries(entries) if clean else entries
+
+def transcript_text(entries):
+    return render_transcript(entries, TIMESTAMP_INTERVAL)
+
 def get_video_transcript(video_id):
     try:
-        transcript = YouTubeTranscriptApi.get_transcript(video_id)
-        return ' '.join([entry['text'] for entry in transcript])
+        raw_entries = get_transcript_entries(video_id, clean=False)
+        if not CLEAN_TRANSCRIPTS:
+            return transcript_text(raw_entries)
+        transcript = transcript_text(clean_entries(raw_entries))
+        raw_tokens = estimate_tokens(' '.join(entry['text'] for entry in raw_entries))
+        saved = raw_tokens - estimate_tokens(transcript)
+        metrics.count('transcript_tokens_saved', saved)
+        print(f"Transcript {video_id}: about {saved} of {raw_tokens} tokens saved by cleaning")
+        return transcript
     except Exception as e:
         print(f"Error getting transcript: {e}")
         return None
 
-def generate_summary(transcript):
-    vertexai.init(project=PROJECT_ID, location=REGION)
-    model = GenerativeModel("gemini-1.5-pro")
-    generation_config = {
-        "max_output_tokens": 8192,
-        "temperature": 0.7,
-        "top_p": 0.95,
-    }
-    response = model.generate_content(
-        [transcript, PROMPT_SUMMARY],
-        generation_config=generation_config,
-        stream=False,
+def chunk_transcript(entries, max_chars=CHUNK_CHARS):
+    """
+    Groups transcript entries into chunks of about max_chars, split only between entries.
+
+    Returns:
+        list: (start, end, text) tuples, with offsets in seconds.
+    """
+    chunks = []
+    current = []
+    size = 0
+    for entry in entries:
+        if current and size + len(entry['text']) > max_chars:
+            chunks.append(current)
+            current, size = [], 0
+        current.append(entry)
+        size += len(entry['text']) + 1
+    if current:
+        chunks.append(current)
+    return [
+        (chunk[0]['start'], chunk[-1]['start'] + chunk[-1].get('duration', 0), ' '.join(entry['text'] for entry in chunk))
+        for chunk in chunks
+    ]
+
+def generate_summary(transcript, on_chunk=None, entries=None):
+    # Calls sent to the light model under pressure or after a timeout are not cached,
+    # so a degraded summary is not served for the lifetime of the cache entry
+    fallbacks = []
+    on_fallback = fallbacks.append
+    if entries and len(transcript) > CHUNKED_SUMMARY_CHARS:
+        key = content_key(
+            transcript, PROMPT_SUMMARY, PROMPT_CHUNK, PROMPT_REDUCE, SUMMARY_MODEL, LIGHT_MODEL,
+            LIGHT_MODEL_MAX_TOKENS, GENERATION_CONFIG, CHUNK_CHARS,
+        )
+        compute = lambda: _generate_chunked_summary(entries, on_chunk, on_fallback)
+    else:
+        key = content_key(transcript, PROMPT_SUMMARY, SUMMARY_MODEL, LIGHT_MODEL, LIGHT_MODEL_MAX_TOKENS, GENERATION_CONFIG)
+        compute = lambda: _generate_summary(transcript, on_chunk, on_fallback)
+    return summary_cache.get_or_compute(key, compute, on_hit=on_chunk, cacheable=lambda: not fallbacks)
+
+def generate_llm(contents, on_chunk=None, priority=BULK, on_fallback=None):
+    return scheduler.generate(
+        SUMMARY_MODEL, contents, on_chunk, GENERATION_CONFIG, priority=priority, light_model=LIGHT_MODEL,
+        on_fallback=on_fallback,
     )
-    return response.text
-
-def generate_qa(transcript, conversation_history, question):
-    vertexai.init(project=PROJECT_ID, location=REGION)
-    model = GenerativeModel("gemini-1.5-pro")
-    generation_config = {
-        "max_output_tokens": 8192,
-        "temperature": 0.7,
-        "top_p": 0.95,
-    }
+
+def _generate_summary(transcript, on_chunk=None, on_fallback=None):
+    return generate_llm([transcript, PROMPT_SUMMARY], on_chunk, on_fallback=on_fallback)
+
+def _summarize_chunk(start, end, text, on_fallback=None):
+    prompt = PROMPT_CHUNK.format(start=format_offset(start), end=format_offset(end))
+    notes = generate_llm([text, prompt], on_fallback=on_fallback)
+    return f"# Part {format_offset(start)} - {format_offset(end)}\n{notes}"
+
+def _generate_chunked_summary(entries, on_chunk=None, on_fallback=None):
+    chunks = chunk_transcript(entries)
+    with ThreadPoolExecutor(max_workers=CHUNK_PARALLELISM, thread_name_prefix='youtube-chunk') as pool:
+        notes = list(pool.map(lambda chunk: _summarize_chunk(*chunk, on_fallback=on_fallback), chunks))
+    return generate_llm(["\n\n".join(notes), PROMPT_REDUCE, PROMPT_SUMMARY], on_chunk, on_fallback=on_fallback)
+
+def build_transcript_index(entries):
+    return BM25Index(chunk_transcript(entries, QA_PASSAGE_CHARS))
+
+def generate_qa(transcript, conversation_history, question, on_chunk=None, index=None):
     context = "\n".join([f"Q: {q}\nA: {a}" for q, a in conversation_history])
+    passages = None
+    if QA_MODE == 'retrieval' and index is not None and len(index.passages) > QA_TOP_K:
+        # Follow-ups like "what did he mean by that?" need the previous question's terms too
+        query = " ".join([conversation_history[-1][0], question]) if conversation_history else question
+        passages = index.search(query, QA_TOP_K)
+    if passages:
+        excerpts = "\n".join(f"[{format_offset(start)}] {text}" for start, _, text in passages)
+        transcript_section = f"Relevant Transcript Excerpts (with timestamps): \n    {excerpts}"
+    else:
+        transcript_section = f"Full Transcript: \n    {transcript}"
     full_context = f"""
     ---
-    Full Transcript: 
-    {transcript}
+    {transcript_section}
     ---
     Conversation History:
     {context}
@@ -128,84 +367,113 @@ def generate_qa(transcript, conversation_history, question):
     ---
     """
     prompt = f"{PROMPT_QA}\n\nContext: {full_context}"
-    response = model.generate_content(
-        [prompt],
-        generation_config=generation_config,
-        stream=False,
-    )
-    return response.text
-
-async def send_long_message(channel, message):
-    if len(message) <= 2000:
-        await channel.send(message)
-        return
-    chunks = [message[i:i + 2000] for i in range(0, len(message), 2000)]
-    for chunk in chunks:
-        await channel.send(chunk)
+    return generate_llm([prompt], on_chunk, priority=INTERACTIVE)
 
 intents = discord.Intents.default()
 intents.message_content = True
 client = discord.Client(intents=intents)
 
-# Global dictionary to store VideoContext objects for each channel
-channel_contexts = {}
+job_queue = JobQueue()
+
+async def process_video(channel, url):
+    video_id = extract_video_id(url)
+    transcript, info = await asyncio.gather(
+        run_blocking('transcript', get_video_transcript, video_id),
+        run_blocking('metadata', get_youtube_video_info, YOUTUBE_DATA_API_KEY, url),
+    )
+    result = json.loads(info) if info else {}
+
+    if transcript:
+        video_context = VideoContext(
+            video_id,
+            url,
+            title=result.get("title", "N/A").strip(),
+            channel=result.get("channel", "N/A"),
+            release_date=format_timestamp(result.get("release_date", "")),
+        )
+        entries = await run_blocking('transcript', get_transcript_entries, video_id)
+        video_context.transcript = transcript
+        video_context.index = await run_blocking('transcript', build_transcript_index, entries)
+        context_store.add(channel.id, video_context)
+
+        videodata = f"""**Title:** {video_context.title}\n**Channel:** {video_context.channel}\n**Released:** {video_context.release_date}"""
+        if STREAM_RESPONSES:
+            async with MessageStreamer(channel, prefix=f'{videodata}\n') as streamer:
+                summary = await run_blocking('llm', generate_summary, transcript, streamer.feed, entries)
+        else:
+            summary = await run_blocking('llm', generate_summary, transcript, entries=entries)
+            await send_long_message(channel, f'{videodata}\n{summary}')
+        video_context.summary = summary
+        context_store.save(channel.id)
+    else:
+        await channel.send(f'Failed to get transcript for video!')
+
+async def answer_question(channel, question, position=1):
+    video_context = context_store.get(channel.id, position)
+    if video_context is None:
+        await channel.send(f'No recent video information found. Please submit a YouTube URL first.')
+        return
+
+    try:
+        await run_blocking('transcript', video_context.load)
+    except Exception as e:
+        print(f"Error reloading transcript for {video_context.video_id}: {e}")
+        await channel.send(f'Failed to get transcript for video!')
+        return
+    context_store.touch(video_context)
+
+    if STREAM_RESPONSES:
+        async with MessageStreamer(channel) as streamer:
+            qa_response = await run_blocking('ask', generate_qa, video_context.transcript, video_context.conversation_history, question, streamer.feed, video_context.index)
+    else:
+        qa_response = await run_blocking('ask', generate_qa, video_context.transcript, video_context.conversation_history, question, index=video_context.index)
+        await send_long_message(channel, qa_response)
+    video_context.conversation_history.append((question, qa_response))
+    context_store.save(channel.id)
+
+async def list_videos(channel):
+    contexts = context_store.recent(channel.id)
+    if not contexts:
+        await channel.send(f'No recent video information found. Please submit a YouTube URL first.')
+        return
+    lines = [f"**#{i}** {context.title} ({context.channel}) <{context.url}>" for i, context in enumerate(contexts, 1)]
+    await send_long_message(channel, "Use `/ask #N <question>` to ask about an older video:\n" + "\n".join(lines))
 
 @client.event
 async def on_ready():
+    metrics.configure(bot='youtube-summarizer')
+    metrics.serve()
+    await run_blocking('llm', models.warm_up, SUMMARY_MODEL, GENERATION_CONFIG)
+    if LIGHT_MODEL:
+        await run_blocking('llm', models.warm_up, LIGHT_MODEL, GENERATION_CONFIG)
     print(f'Youtube summarizer is ready!')
 
 @client.event
 async def on_message(message):
-    global channel_contexts
-
     if message.author == client.user:
         return
 
     if message.channel.name == INBOX_CHANNEL:
-        channel_id = message.channel.id
-        if channel_id not in channel_contexts:
-            channel_contexts[channel_id] = VideoContext()
-
-        video_context = channel_contexts[channel_id]
-
         urls = url_pattern.findall(message.content)
 
         if urls:
             # YouTube URL request
-            video_context.reset()  # Reset context only for new YouTube URL
-            url = urls[0]
-            video_id = extract_video_id(url)
-            transcript = get_video_transcript(video_id)
-            result = json.loads(get_youtube_video_info(YOUTUBE_DATA_API_KEY, url))
-
-            # Update video context
-            video_context.url = url
-            video_context.transcript = transcript
-            video_context.title = result.get("title", "N/A").strip()
-            video_context.channel = result.get("channel", "N/A")
-            video_context.release_date = format_timestamp(result.get("release_date"))
-
-            if transcript:
-                summary = generate_summary(transcript)
-                video_context.summary = summary
-                videodata = f"""**Title:** {video_context.title}\n**Channel:** {video_context.channel}\n**Released:** {video_context.release_date}"""
-                await send_long_message(message.channel, f'{videodata}\n{summary}')
-            else:
-                await message.channel.send(f'Failed to get transcript for video!')
+            await job_queue.enqueue(message.channel, partial(process_video, message.channel, urls[0]))
 
         elif message.content.startswith('/ask'):
-            # Q&A request
-            question = message.content[len('/ask '):].strip()
+            # Q&A request, queued behind any summary still running in this channel.
+            # "/ask #2 ..." asks about the second most recent video.
+            match = ask_pattern.match(message.content)
+            position = int(match.group(1) or 1)
+            question = match.group(2).strip()
+            await job_queue.enqueue(message.channel, partial(answer_question, message.channel, question, position))
 
-            if video_context.url and video_context.transcript:
-                qa_response = generate_qa(video_context.transcript, video_context.conversation_history, question)
-                await send_long_message(message.channel, qa_response)
-                video_context.conversation_history.append((question, qa_response))
-            else:
-                await message.channel.send(f'No recent video information found. Please submit a YouTube URL first.')
+        elif message.content.startswith('/videos'):
+            await job_queue.enqueue(message.channel, partial(list_videos, message.channel))
 
         else:
             await message.channel.send(f'OK!')
             pass
 
-client.run(DISCORD_TOKEN)
\ No newline at end of file
+if __name__ == '__main__':
+    client.run(DISCORD_TOKEN)